@@ -8,14 +8,20 @@ from .src.solution import *
 from .src.file_io import *
 from .src.run import *
 from .src.expression import *
+from .src.array_expression import *
 from .src.parameter import *
+from .src.build_profile import *
+from .src.compiled_model import *
+from .src.solution_pool import *
+from .src.fingerprint import *
+from .src.solve_cache import *
+from .src.warm_start import *
 
 # keep relative namespace
 from .src import variable
 from .src import solver
 from .src import util
 
-from .test import stress_test
 from .test import unit_test
 
 from .definitions import ROOT_DIR
\ No newline at end of file
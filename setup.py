@@ -31,6 +31,9 @@ See full documentation on the project homepage: https://github.com/aphi/PyFlip "
         'bin/win_32/LICENSE.txt',
     ]},
     include_package_data=True,
+    extras_require={
+        'array': ['numpy'],
+    },
     license='MIT',
     classifiers=[
         "Programming Language :: Python :: 3.6",
@@ -0,0 +1,294 @@
+from numbers import Number, Integral
+
+try:
+    import numpy as np
+except ImportError: # numpy is an optional dependency, only required for array-backed features
+    np = None
+
+import pyflip as flp
+
+class ArrayExpression:
+    """
+    Alternative Expression representation, backed by parallel arrays of variable indices and coefficients.
+    Indices are those assigned by Model.add_variables, so an ArrayExpression is bound to a single model.
+
+    Operators concatenate arrays rather than merging dicts term by term. Repeated indices are allowed,
+    and are only summed together when required (see compress).
+
+    In-place operators (+=, -=, *=, /=) and add_term append into over-allocated buffers,
+    so an expression can be accumulated term by term in amortised linear time.
+    """
+    def __init__(self, model, val=None):
+        flp.util.require_module(np, 'numpy')
+        self.model = model
+
+        if val is None:
+            self.indices = np.empty(0, dtype=np.int64)
+            self.coefs = np.empty(0, dtype=np.float64)
+            self.constant = 0.0
+
+        elif isinstance(val, Number):
+            self.indices = np.empty(0, dtype=np.int64)
+            self.coefs = np.empty(0, dtype=np.float64)
+            self.constant = float(val)
+
+        elif isinstance(val, flp.Variable):
+            self.indices = np.array([_model_index(model, val.name)], dtype=np.int64)
+            self.coefs = np.ones(1, dtype=np.float64)
+            self.constant = 0.0
+
+        elif isinstance(val, flp.Expression):
+            n_terms = len(val.var_dict)
+            self.indices = np.fromiter((_model_index(model, var_name) for var_name in val.var_dict),
+                                       dtype=np.int64, count=n_terms)
+            self.coefs = np.fromiter(val.var_dict.values(), dtype=np.float64, count=n_terms)
+            self.constant = float(val.constant)
+
+        elif isinstance(val, ArrayExpression):
+            _verify_same_model(model, val)
+            self.indices = val.indices.copy()
+            self.coefs = val.coefs.copy()
+            self.constant = val.constant
+
+        else:
+            raise NotImplementedError(f'Cannot generate an ArrayExpression from {type(val)}')
+
+    @property
+    def indices(self):
+        return self._indices[:self._size]
+
+    @indices.setter
+    def indices(self, indices):
+        self._indices = indices
+        self._size = len(indices)
+
+    @property
+    def coefs(self):
+        return self._coefs[:self._size]
+
+    @coefs.setter
+    def coefs(self, coefs):
+        # always set after indices, which defines the size
+        self._coefs = coefs
+
+    def _reserve(self, n_new_terms):
+        """
+        Ensure buffer capacity for n_new_terms appended terms, growing geometrically
+        """
+        required = self._size + n_new_terms
+        capacity = min(len(self._indices), len(self._coefs))
+        if required > capacity:
+            new_capacity = max(required, 2 * capacity, 16)
+            new_indices = np.empty(new_capacity, dtype=np.int64)
+            new_coefs = np.empty(new_capacity, dtype=np.float64)
+            new_indices[:self._size] = self.indices
+            new_coefs[:self._size] = self.coefs
+            self._indices = new_indices
+            self._coefs = new_coefs
+
+    @classmethod
+    def from_arrays(cls, model, indices, coefs, constant=0.0):
+        """
+        Build directly from index and coefficient arrays (not copied if already of the right dtype,
+        so in-place operators on the result may modify the given coefs array)
+        :param model: Model which assigned the variable indices
+        :param indices: array-like of integer variable indices
+        :param coefs: array-like of coefficients, same length as indices
+        :param constant: constant term
+        """
+        self = cls(model, constant)
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.coefs = np.asarray(coefs, dtype=np.float64)
+        if self.indices.shape != self.coefs.shape:
+            raise RuntimeError(f'Shape mismatch between indices {self.indices.shape} and coefs {self.coefs.shape}')
+
+        return self
+
+    def compress(self):
+        """
+        Sum together coefficients of repeated indices (in place). Terms are left sorted by index
+        :return: self
+        """
+        if len(self.indices) > 1:
+            unique_indices, inverse = np.unique(self.indices, return_inverse=True)
+            if len(unique_indices) < len(self.indices):
+                self.coefs = np.bincount(inverse, weights=self.coefs, minlength=len(unique_indices))
+            else:
+                self.coefs = self.coefs[np.argsort(self.indices, kind='stable')]
+            self.indices = unique_indices
+
+        return self
+
+    def var_names(self):
+        self.compress()
+        variable_list = self.model.variable_list
+        return [variable_list[i].name for i in self.indices.tolist()]
+
+    def value(self, soln=None):
+        self.compress()
+        variable_list = self.model.variable_list
+        vals = np.fromiter((soln.get_val(variable_list[i].name) for i in self.indices.tolist()),
+                           dtype=np.float64, count=len(self.indices))
+        return self.constant + float(self.coefs @ vals)
+
+    def to_expression(self):
+        """
+        :return: the equivalent dict-backed Expression
+        """
+        var_names = self.var_names()
+        return flp.Expression.from_var_dict(dict(zip(var_names, self.coefs.tolist())), self.constant)
+
+    def _coerce(self, other):
+        if isinstance(other, ArrayExpression):
+            _verify_same_model(self.model, other)
+            return other
+        elif isinstance(other, (Number, flp.Variable, flp.Expression)):
+            return ArrayExpression(self.model, other)
+
+        return None
+
+    def __neg__(self):
+        return self.__mul__(-1)
+
+    def __add__(self, other):
+        other_e = self._coerce(other)
+        if other_e is None:
+            return NotImplemented
+
+        return ArrayExpression.from_arrays(
+            self.model,
+            np.concatenate((self.indices, other_e.indices)),
+            np.concatenate((self.coefs, other_e.coefs)),
+            self.constant + other_e.constant
+        )
+
+    def __radd__(self, other):
+        return self.__add__(other)
+
+    def __sub__(self, other):
+        other_e = self._coerce(other)
+        if other_e is None:
+            return NotImplemented
+
+        return self.__add__(-other_e)
+
+    def __rsub__(self, other):
+        return (-self).__add__(other)
+
+    def __mul__(self, other):
+        if isinstance(other, Number):
+            return ArrayExpression.from_arrays(self.model, self.indices, self.coefs * other, self.constant * other)
+
+        return NotImplemented
+
+    def __rmul__(self, other):
+        return self.__mul__(other)
+
+    def __truediv__(self, other):
+        if isinstance(other, Number):
+            return self.__mul__(1 / other)
+
+        return NotImplemented
+
+    def add_term(self, coef, var):
+        """
+        Fast path for accumulating a single term in place, i.e. expr += coef * var without the intermediate expression
+        :param coef: number
+        :param var: Variable, or its integer index in the model
+        :return: self
+        """
+        self._reserve(1)
+        self._indices[self._size] = var if isinstance(var, Integral) else _model_index(self.model, var.name)
+        self._coefs[self._size] = coef
+        self._size += 1
+        return self
+
+    def add_terms(self, coefs, indices):
+        """
+        Accumulate many terms in place
+        :param coefs: array-like of coefficients
+        :param indices: array-like of integer variable indices, same length as coefs
+        :return: self
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        coefs = np.broadcast_to(np.asarray(coefs, dtype=np.float64), indices.shape)
+        n_new_terms = len(indices)
+        self._reserve(n_new_terms)
+        self._indices[self._size:self._size + n_new_terms] = indices
+        self._coefs[self._size:self._size + n_new_terms] = coefs
+        self._size += n_new_terms
+        return self
+
+    def _iadd_scaled(self, other, scale):
+        """
+        Append scale * other into this expression in place
+        """
+        if isinstance(other, flp.Variable):
+            return self.add_term(scale, other)
+
+        elif isinstance(other, Number):
+            self.constant += scale * other
+            return self
+
+        other_e = self._coerce(other)
+        if other_e is None:
+            return NotImplemented
+
+        self.add_terms(other_e.coefs * scale, other_e.indices)
+        self.constant += scale * other_e.constant
+        return self
+
+    def __iadd__(self, other):
+        return self._iadd_scaled(other, 1.0)
+
+    def __isub__(self, other):
+        return self._iadd_scaled(other, -1.0)
+
+    def __imul__(self, other):
+        if isinstance(other, Number):
+            self._coefs[:self._size] *= other
+            self.constant *= other
+            return self
+
+        return NotImplemented
+
+    def __itruediv__(self, other):
+        if isinstance(other, Number):
+            return self.__imul__(1 / other)
+
+        return NotImplemented
+
+    def __repr__(self):
+        return repr(self.to_expression())
+
+
+def _model_index(model, var_name):
+    try:
+        return model.var_index[var_name]
+    except KeyError:
+        raise RuntimeError(f'Unrecognised variable {var_name}. Variables must be added to model before use in an ArrayExpression')
+
+def _verify_same_model(model, array_expr):
+    if array_expr.model is not model:
+        raise RuntimeError('Cannot combine ArrayExpressions indexed by different models')
+
+def asum(model, expr_iterable):
+    """
+    Array expression sum, concatenating all terms in a single step
+    :param model: Model which assigns the variable indices
+    :param expr_iterable: iterable of ArrayExpression, Expression, Variable or numbers
+    :return: ArrayExpression
+    """
+    exprs = [expr if isinstance(expr, ArrayExpression) else ArrayExpression(model, expr) for expr in expr_iterable]
+    for expr in exprs:
+        _verify_same_model(model, expr)
+
+    if not exprs:
+        return ArrayExpression(model)
+
+    return ArrayExpression.from_arrays(
+        model,
+        np.concatenate([expr.indices for expr in exprs]),
+        np.concatenate([expr.coefs for expr in exprs]),
+        sum(expr.constant for expr in exprs)
+    )
@@ -0,0 +1,136 @@
+from time import perf_counter
+import re
+
+import pyflip as flp
+
+_FAMILY_SUFFIX_RE = re.compile(r'(_\d+)+$')
+
+def constraint_family(name):
+    """
+    :return: constraint name with any trailing _<number> indices removed, e.g. 'capacity_3_12' -> 'capacity'
+    """
+    return _FAMILY_SUFFIX_RE.sub('', name) or name
+
+
+class BuildProfile:
+    """
+    Opt-in profiler for model building, started with model.profile():
+
+        with model.profile() as profile:
+            ... add constraints ...
+        print(profile.report())
+
+    While active, it counts and times Expression construction (and the var_dict copies it makes),
+    Expression.rearrange_ineq and Model.test_defined_variables. Work is charged to the family of the next constraint
+    added to the model (see constraint_family), or to 'objective'. Work after the last of these is charged to 'other'.
+    Times are inclusive, so e.g. expression_time includes the expressions built within rearrange_ineq.
+    The profiled functions are patched for the duration, so there is no cost when profiling is off
+    """
+    fields = ('constraints', 'expressions', 'dict_copies', 'copied_terms', 'rearrange_ineq', 'test_defined_variables',
+              'checked_terms', 'expression_time', 'rearrange_ineq_time', 'test_defined_variables_time', 'total_time')
+    active = False
+
+    def __init__(self, model, family=constraint_family):
+        """
+        :param family: function of a constraint name, returning the family to report it under
+        """
+        self.model = model
+        self.family = family
+        self.families = {} # family -> dict of stats, by field
+        self.pending = dict.fromkeys(self.fields, 0)
+        self._originals = {}
+
+    def __enter__(self):
+        if BuildProfile.active:
+            raise RuntimeError('A model build profile is already active')
+        BuildProfile.active = True
+        self._last_charge = perf_counter()
+
+        profile = self
+        pending = self.pending
+        expression_init = flp.Expression.__init__
+        rearrange_ineq = flp.Expression.__dict__['rearrange_ineq']
+        test_defined_variables = flp.Model.test_defined_variables
+        add_constraints = flp.Model.add_constraints
+        add_objective = flp.Model.add_objective
+
+        def profiled_expression_init(self, val=None):
+            if isinstance(val, flp.Expression):
+                pending['dict_copies'] += 1
+                pending['copied_terms'] += len(val.var_dict)
+            start = perf_counter()
+            expression_init(self, val)
+            pending['expression_time'] += perf_counter() - start
+            pending['expressions'] += 1
+
+        def profiled_rearrange_ineq(cls, lhs_expr, rhs_expr):
+            start = perf_counter()
+            result = rearrange_ineq.__func__(cls, lhs_expr, rhs_expr)
+            pending['rearrange_ineq_time'] += perf_counter() - start
+            pending['rearrange_ineq'] += 1
+            return result
+
+        def profiled_test_defined_variables(self, expr):
+            start = perf_counter()
+            test_defined_variables(self, expr)
+            pending['test_defined_variables_time'] += perf_counter() - start
+            pending['test_defined_variables'] += 1
+            pending['checked_terms'] += len(expr.var_dict)
+
+        def profiled_add_constraints(self, *constraints, overwrite=False):
+            add_constraints(self, *constraints, overwrite=overwrite)
+            if self is profile.model and constraints:
+                pending['constraints'] += len(constraints)
+                profile.charge(profile.family(constraints[0].name))
+
+        def profiled_add_objective(self, objective):
+            add_objective(self, objective)
+            if self is profile.model:
+                profile.charge('objective')
+
+        self._originals = {
+            (flp.Expression, '__init__'): expression_init,
+            (flp.Expression, 'rearrange_ineq'): rearrange_ineq,
+            (flp.Model, 'test_defined_variables'): test_defined_variables,
+            (flp.Model, 'add_constraints'): add_constraints,
+            (flp.Model, 'add_objective'): add_objective,
+        }
+        flp.Expression.__init__ = profiled_expression_init
+        flp.Expression.rearrange_ineq = classmethod(profiled_rearrange_ineq)
+        flp.Model.test_defined_variables = profiled_test_defined_variables
+        flp.Model.add_constraints = profiled_add_constraints
+        flp.Model.add_objective = profiled_add_objective
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        for (cls, attr), original in self._originals.items():
+            setattr(cls, attr, original)
+        BuildProfile.active = False
+
+        if any(self.pending.values()):
+            self.charge('other')
+
+    def charge(self, family):
+        """
+        Add the work done since the last charge to a family
+        """
+        now = perf_counter()
+        self.pending['total_time'] += now - self._last_charge
+        self._last_charge = now
+
+        stats = self.families.setdefault(family, dict.fromkeys(self.fields, 0))
+        for field, value in self.pending.items():
+            stats[field] += value
+        self.pending.update(dict.fromkeys(self.fields, 0))
+
+    def report(self):
+        """
+        :return: table of stats per family, slowest first
+        """
+        columns = ('family',) + self.fields
+        rows = [columns]
+        for family, stats in sorted(self.families.items(), key=lambda item: -item[1]['total_time']):
+            rows.append((family,) + tuple(f'{value:.4f}' if field.endswith('time') else str(value) for field, value in stats.items()))
+
+        widths = [max(len(row[i]) for row in rows) for i in range(len(columns))]
+        return '\n'.join('  '.join(value.rjust(width) for value, width in zip(row, widths)) for row in rows)
@@ -0,0 +1,262 @@
+from math import inf
+
+try:
+    import numpy as np
+except ImportError: # numpy is an optional dependency, only required for array-backed features
+    np = None
+
+import pyflip as flp
+from .util import EPS
+
+
+class CompiledModel:
+    """
+    Snapshot of a model's constraints and objective as arrays, for evaluating many solutions quickly,
+    e.g. in a local search heuristic. Constraint rows are stored in CSR form, in the order of model.constraints,
+    with columns by variable index (model.var_index). Changes to the model after compiling are not reflected.
+
+    Solutions may be given as a Solution, a list of Solutions, or an array of values with variables by index,
+    either 1-D for one solution or 2-D with one solution per row. Results are 1-D or 2-D to match
+    """
+    def __init__(self, model):
+        flp.util.require_module(np, 'numpy')
+        self.model = model
+        self.var_names = [var.name for var in model.variable_list]
+        self.row_names = list(model.constraints)
+        var_index = model.var_index
+
+        indptr = [0]
+        index_chunks, data_chunks, rhs, senses = [], [], [], []
+        for con in model.constraints.values():
+            if isinstance(con, flp.BlockConstraint):
+                block, row = con.block, con.row
+                start, end = block.indptr[row], block.indptr[row + 1]
+                index_chunks.append(block.indices[start:end])
+                data_chunks.append(block.data[start:end])
+                rhs.append(block.rhs[row])
+                senses.append(block.senses[row])
+            else:
+                var_dict = con._lhs.var_dict
+                index_chunks.append(np.fromiter((var_index[name] for name in var_dict), dtype=np.int64, count=len(var_dict)))
+                data_chunks.append(np.fromiter(var_dict.values(), dtype=np.float64, count=len(var_dict)))
+                rhs.append(con._rhs.constant - con._lhs.constant)
+                senses.append(con.mid)
+            indptr.append(indptr[-1] + len(index_chunks[-1]))
+
+        n_rows = len(self.row_names)
+        self.indptr = np.array(indptr, dtype=np.int64)
+        self.indices = np.concatenate(index_chunks).astype(np.int64) if n_rows else np.zeros(0, dtype=np.int64)
+        self.data = np.concatenate(data_chunks).astype(np.float64) if n_rows else np.zeros(0)
+        self.row_of_entry = np.repeat(np.arange(n_rows, dtype=np.int64), np.diff(self.indptr))
+
+        # rows as lower <= activity <= upper
+        rhs = np.array(rhs, dtype=np.float64)
+        senses = np.array(senses, dtype='<U2')
+        self.lower = np.where(senses == flp.ConstraintEq.LEQ.value, -inf, rhs)
+        self.upper = np.where(senses == flp.ConstraintEq.GEQ.value, inf, rhs)
+
+        objective_expr = model.objective.expr
+        self.objective_coefs = np.zeros(len(self.var_names))
+        for name, coef in objective_expr.var_dict.items():
+            self.objective_coefs[var_index[name]] += coef
+        self.objective_constant = objective_expr.constant
+
+    def num_rows(self):
+        return len(self.row_names)
+
+    def solution_array(self, soln):
+        """
+        :param soln: Solution, or list of Solutions
+        :return: array of variable values by index (2-D for a list). For an ArraySolution of the model, a view of its values
+        """
+        if isinstance(soln, flp.ArraySolution) and soln.index is self.model.var_index:
+            return soln.values[:len(self.var_names)] # no copy. The slice allows for variables added after compiling
+        if isinstance(soln, flp.Solution):
+            var_dict = soln.var_dict
+            try:
+                return np.fromiter((var_dict[name] for name in self.var_names), dtype=np.float64, count=len(self.var_names))
+            except KeyError as e:
+                raise KeyError(f'This solution does not include the variable {e.args[0]}')
+        return np.array([self.solution_array(s) for s in soln]).reshape(-1, len(self.var_names))
+
+    def _values(self, x):
+        if isinstance(x, flp.Solution) or (isinstance(x, (list, tuple)) and x and isinstance(x[0], flp.Solution)):
+            return self.solution_array(x)
+        x = np.asarray(x, dtype=np.float64)
+        if x.shape[-1] != len(self.var_names) or x.ndim > 2:
+            raise RuntimeError(f'Expected values for {len(self.var_names)} variables, got an array of shape {x.shape}')
+        return x
+
+    def activities(self, x):
+        """
+        :return: value of each constraint's left-hand side (in rearranged form, variables only)
+        """
+        x = self._values(x)
+        n_rows = self.num_rows()
+        products = self.data * x[..., self.indices]
+        if x.ndim == 1:
+            return np.bincount(self.row_of_entry, weights=products, minlength=n_rows)
+
+        # all solutions in one bincount, with the rows of solution k offset by k * n_rows
+        n_solns = x.shape[0]
+        bins = self.row_of_entry + (n_rows * np.arange(n_solns, dtype=np.int64))[:, None]
+        return np.bincount(bins.ravel(), weights=products.ravel(), minlength=n_solns * n_rows).reshape(n_solns, n_rows)
+
+    def slacks(self, x):
+        """
+        :return: slack of each constraint: distance from its activity to the nearest violated side.
+            Negative where the constraint is violated. For equality constraints this is minus the absolute error
+        """
+        activities = self.activities(x)
+        return np.minimum(activities - self.lower, self.upper - activities)
+
+    def violations(self, x):
+        """
+        :return: amount by which each constraint is violated, or 0
+        """
+        return np.maximum(-self.slacks(x), 0.0)
+
+    def violated_rows(self, x, tol=EPS):
+        """
+        :return: indices (into row_names) of the constraints violated by more than tol. For several solutions,
+            a list with an index array per solution
+        """
+        violated = self.violations(x) > tol
+        if violated.ndim == 1:
+            return np.flatnonzero(violated)
+        return [np.flatnonzero(row) for row in violated]
+
+    def is_feasible(self, x, tol=EPS):
+        """
+        :return: whether all constraints are satisfied (to within tol), as for Model.is_feasible. An array for several solutions
+        """
+        feasible = (self.violations(x) <= tol).all(axis=-1)
+        return bool(feasible) if feasible.ndim == 0 else feasible
+
+    def objective_values(self, x):
+        """
+        :return: objective value, or an array of objective values for several solutions
+        """
+        values = self._values(x) @ self.objective_coefs + self.objective_constant
+        return float(values) if np.ndim(values) == 0 else values
+
+
+class DeltaEvaluator:
+    """
+    Keeps the constraint activities, violations and objective value of a current solution up to date as a few variables
+    change at a time, e.g. for scanning flip or swap neighbourhoods in a local search. A move costs time in proportion
+    to the nonzeros in the changed variables' columns, rather than the size of the model:
+
+        evaluator = flp.DeltaEvaluator(model, soln)
+        objective_delta, violation_delta = evaluator.try_move({'x_3': 0, 'x_7': 1})
+        if ...: evaluator.commit()
+        else: evaluator.rollback()
+
+    Calling try_move again before commit or rollback first rolls back the pending move
+    """
+    def __init__(self, model, soln, tol=EPS):
+        """
+        :param model: Model, or a CompiledModel
+        :param soln: starting Solution, or array of variable values by index
+        :param tol: tolerance for counting a constraint as violated
+        """
+        self.compiled = model if isinstance(model, CompiledModel) else CompiledModel(model)
+        self.tol = tol
+        compiled = self.compiled
+
+        # columns of the constraint matrix, for updating the rows of a changed variable
+        order = np.argsort(compiled.indices, kind='stable')
+        self.col_rows = compiled.row_of_entry[order]
+        self.col_data = compiled.data[order]
+        self.col_indptr = np.zeros(len(compiled.var_names) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(compiled.indices, minlength=len(compiled.var_names)), out=self.col_indptr[1:])
+
+        self.values = np.array(compiled._values(soln), dtype=np.float64)
+        if self.values.ndim != 1:
+            raise RuntimeError('DeltaEvaluator takes a single solution')
+        self.activities = compiled.activities(self.values)
+        violations = self._violations(np.arange(compiled.num_rows()))
+        self.total_violation = float(violations.sum())
+        self.n_violated = int((violations > tol).sum())
+        self.objective_value = compiled.objective_values(self.values)
+
+        self._undo = None
+
+    def _violations(self, rows):
+        activities = self.activities[rows]
+        return np.maximum(np.maximum(self.compiled.lower[rows] - activities, activities - self.compiled.upper[rows]), 0.0)
+
+    def _var_index(self, var):
+        if isinstance(var, flp.Variable):
+            var = var.name
+        return self.compiled.model.var_index[var] if isinstance(var, str) else int(var)
+
+    def try_move(self, changes):
+        """
+        Apply a move tentatively, until commit or rollback
+        :param changes: dict of variable (name, Variable or index) to new value
+        :return: change in objective value, change in total constraint violation
+        """
+        if self._undo is not None:
+            self.rollback()
+
+        var_indices = [self._var_index(var) for var in changes]
+        new_values = np.fromiter(changes.values(), dtype=np.float64, count=len(changes))
+        old_values = self.values[var_indices]
+        deltas = new_values - old_values
+
+        starts, ends = self.col_indptr[var_indices], self.col_indptr[np.add(var_indices, 1)]
+        if len(var_indices) == 1:
+            rows = self.col_rows[starts[0]:ends[0]]
+            row_deltas = deltas[0] * self.col_data[starts[0]:ends[0]]
+        else: # rows may repeat across columns
+            entries = np.concatenate([np.arange(start, end) for start, end in zip(starts.tolist(), ends.tolist())])
+            rows, inverse = np.unique(self.col_rows[entries], return_inverse=True)
+            row_deltas = np.bincount(inverse, weights=np.repeat(deltas, ends - starts) * self.col_data[entries], minlength=len(rows))
+
+        old_activities = self.activities[rows]
+        old_violations = self._violations(rows)
+        self.activities[rows] = old_activities + row_deltas
+        new_violations = self._violations(rows)
+
+        objective_delta = float(deltas @ self.compiled.objective_coefs[var_indices])
+        violation_delta = float(new_violations.sum() - old_violations.sum())
+        self._undo = (var_indices, old_values, rows, old_activities, self.objective_value, self.total_violation, self.n_violated)
+
+        self.values[var_indices] = new_values
+        self.objective_value += objective_delta
+        self.total_violation += violation_delta
+        self.n_violated += int((new_violations > self.tol).sum() - (old_violations > self.tol).sum())
+        return objective_delta, violation_delta
+
+    def commit(self):
+        """
+        Keep the pending move
+        """
+        self._undo = None
+
+    def rollback(self):
+        """
+        Undo the pending move, if any
+        """
+        if self._undo is None:
+            return
+        var_indices, old_values, rows, old_activities, self.objective_value, self.total_violation, self.n_violated = self._undo
+        self.values[var_indices] = old_values
+        self.activities[rows] = old_activities
+        self._undo = None
+
+    def is_feasible(self):
+        return self.n_violated == 0
+
+    def violated_rows(self):
+        """
+        :return: indices (into compiled.row_names) of the violated constraints
+        """
+        return np.flatnonzero(self._violations(slice(None)) > self.tol)
+
+    def solution(self):
+        """
+        :return: the current values as a Solution
+        """
+        return flp.Solution(dict(zip(self.compiled.var_names, self.values.tolist())))
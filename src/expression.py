@@ -27,6 +27,10 @@ class Expression:
             self.var_dict = copy(val.var_dict)
             self.constant = copy(val.constant)
 
+        elif isinstance(val, flp.ArrayExpression):
+            self.var_dict = val.to_expression().var_dict
+            self.constant = val.constant
+
         else:
             raise NotImplementedError(f'Cannot generate an Expression from {type(val)}')
 
@@ -63,6 +67,9 @@ class Expression:
         return self.__mul__(-1)
 
     def __add__(self, other):
+        if isinstance(other, flp.ArrayExpression):
+            return NotImplemented # defer to ArrayExpression.__radd__
+
         copied_e = Expression(self)
         other_e = Expression(other)
 
@@ -82,6 +89,9 @@ class Expression:
         return self.__add__(other)
 
     def __sub__(self, other):
+        if isinstance(other, flp.ArrayExpression):
+            return NotImplemented
+
         return self.__add__(-other)
 
     def __rsub__(self, other):
@@ -108,18 +118,73 @@ class Expression:
 
         return NotImplemented
 
-    def __iadd__(self, other):
-        # merge other_e into copied_e
-        for var_name, coef in other.var_dict.items():
-            if var_name in other.var_dict:
-                self.var_dict[var_name] += coef
-            else:
-                self.var_dict[var_name] = coef
+    def add_term(self, coef, var):
+        """
+        Fast path for accumulating a single term in place, i.e. expr += coef * var without the intermediate Expression
+        :param coef: number
+        :param var: Variable
+        :return: self
+        """
+        var_dict = self.var_dict
+        var_name = var.name
+        if var_name in var_dict:
+            var_dict[var_name] += coef
+        else:
+            var_dict[var_name] = coef
 
-        self.constant += other.constant
+        return self
+
+    def _iadd_scaled(self, other, scale):
+        """
+        Merge scale * other into this expression in place
+        """
+        if isinstance(other, flp.Variable):
+            return self.add_term(scale, other)
+
+        elif isinstance(other, Number):
+            self.constant += scale * other
+
+        elif isinstance(other, Expression):
+            var_dict = self.var_dict
+            for var_name, coef in other.var_dict.items():
+                if var_name in var_dict:
+                    var_dict[var_name] += scale * coef
+                else:
+                    var_dict[var_name] = scale * coef
+
+            self.constant += scale * other.constant
+
+        elif isinstance(other, flp.ArrayExpression):
+            return self._iadd_scaled(other.to_expression(), scale)
+
+        else:
+            return NotImplemented
 
         return self
 
+    def __iadd__(self, other):
+        return self._iadd_scaled(other, 1.0)
+
+    def __isub__(self, other):
+        return self._iadd_scaled(other, -1.0)
+
+    def __imul__(self, other):
+        if isinstance(other, Number):
+            var_dict = self.var_dict
+            for var_name in var_dict:
+                var_dict[var_name] *= other
+
+            self.constant *= other
+            return self
+
+        return NotImplemented
+
+    def __itruediv__(self, other):
+        if isinstance(other, Number):
+            return self.__imul__(1 / other)
+
+        return NotImplemented
+
     def __repr__(self):
         terms = []
 
@@ -150,7 +215,7 @@ def tsum(term_iterable):
 
     var_dict = {}
     for (coef, var) in term_iterable:
-        if coef not in var_dict:
+        if var.name not in var_dict:
             var_dict[var.name] = coef
         else:
             var_dict[var.name] += coef
@@ -168,7 +233,7 @@ def esum(expr_iterable):
     constant = 0
     for expr in expr_iterable:
         for (var_name, coef) in expr.var_dict.items():
-            if coef not in var_dict:
+            if var_name not in var_dict:
                 var_dict[var_name] = coef
             else:
                 var_dict[var_name] += coef
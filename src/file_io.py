@@ -2,69 +2,962 @@
 LP Files
 https://www.ibm.com/support/knowledgecenter/SSSA5P_12.5.0/ilog.odms.cplex.help/CPLEX/FileFormats/topics/LP.html
 http://www.gurobi.com/documentation/8.0/refman/lp_format.html
+
+MPS Files
+https://www.ibm.com/support/knowledgecenter/SSSA5P_12.5.0/ilog.odms.cplex.help/CPLEX/FileFormats/topics/MPS.html
+http://www.gurobi.com/documentation/8.0/refman/mps_format.html
 """
-from math import isinf
+from math import isinf, inf
 from os import path
+from array import array
+import io
+import gzip
+import re
+
+try:
+    import numpy as np
+except ImportError: # numpy is an optional dependency, only required for array-backed features
+    np = None
 
 import pyflip as flp
 
+LP_MAX_LINE_LENGTH = 255 # lines may be up to 510 characters in CPLEX LP format, 255 is safe for all readers
+WRITE_BUFFER_SIZE = 1 << 20
 
-def write_lp_file(model, filename, directory='.'):
-    full_filename = path.join(directory, filename)
 
+def get_float_formatter(float_format):
+    """
+    :param float_format: 'repr' (shortest representation which round-trips), a %-format string e.g. '%.17g', or a callable
+    :return: callable formatting a number as a string, or None for the default 'repr' formatting
+    """
+    if callable(float_format):
+        return float_format
+    elif float_format == 'repr':
+        return None # str() of a float is its repr, and f-strings also print numpy scalars as plain numbers
+    elif isinstance(float_format, str) and float_format.startswith('%'):
+        return lambda val: float_format % val
+    else:
+        raise RuntimeError(f'Unrecognised float format {float_format}')
+
+
+def wrap_line(line, max_line_length=LP_MAX_LINE_LENGTH):
+    """
+    Split a line so that no line exceeds max_line_length, preferably between terms
+    :return: string with embedded newlines, continuation lines indented
+    """
+    if len(line) <= max_line_length:
+        return line
+
+    lines = []
+    while len(line) > max_line_length:
+        split_at = max(line.rfind(' + ', 0, max_line_length), line.rfind(' - ', 0, max_line_length))
+        if split_at <= 4:
+            split_at = line.rfind(' ', 0, max_line_length + 1)
+        if split_at <= 4: # no space to split at
+            split_at = line.find(' ', max_line_length)
+            if split_at == -1:
+                break
+        lines.append(line[:split_at])
+        line = '    ' + line[split_at + 1:]
+    lines.append(line)
+
+    return '\n'.join(lines)
+
+
+def _terms_str(var_names, coefs, fmt):
+    """
+    Format linear terms as 'c1 x1 + c2 x2 - c3 x3'
+    """
+    if fmt is None: # default formatting, inlined for speed
+        terms = [f'+ {coef} {var_name}' if coef >= 0 else f'- {-coef} {var_name}' for var_name, coef in zip(var_names, coefs)]
+    else:
+        terms = [f'+ {fmt(coef)} {var_name}' if coef >= 0 else f'- {fmt(-coef)} {var_name}' for var_name, coef in zip(var_names, coefs)]
+
+    # the first term carries its own sign
+    if terms:
+        terms[0] = terms[0][2:] if terms[0][0] == '+' else '-' + terms[0][2:]
+
+    return ' '.join(terms)
+
+
+def _constant_str(constant, fmt):
+    return f'{flp.util.sign(constant)}{abs(constant) if fmt is None else fmt(abs(constant))}'
+
+
+def lp_file_lines(model, float_format='repr', max_line_length=LP_MAX_LINE_LENGTH):
+    """
+    Generate the lines of an LP file describing this model, without trailing newlines
+    :param model: Model object
+    :param float_format: see get_float_formatter
+    :param max_line_length: long lines are wrapped to this length
+    """
+    fmt = get_float_formatter(float_format)
+
+    # Title section
+    yield f'\\ {model.name}'
+
+    # Objective function
+    yield model.objective.dir
+    expr = model.objective.expr
+    if expr.var_dict:
+        line = f'  {model.objective.name}: {_terms_str(expr.var_dict.keys(), expr.var_dict.values(), fmt)}'
+        if abs(expr.constant) > flp.util.EPS:
+            line += f' {flp.util.sign(expr.constant)} {_constant_str(expr.constant, fmt)[1:]}'
+        yield wrap_line(line, max_line_length)
+    else:
+        yield f'  {model.objective.name}:' # omit the constant (because it confuses gurobi_cl)
+
+    # Constraints (printed in rearranged form)
+    yield 'subject to'
+    block_rows = {} # rows of each constraint block as python lists, converted once per block (keyed by object, as block names need not be unique)
+    variable_names = None
+    for constraint in model.constraints.values():
+        if isinstance(constraint, flp.BlockConstraint):
+            block = constraint.block
+            if id(block) not in block_rows:
+                block_rows[id(block)] = (block.indptr.tolist(), block.indices.tolist(), block.data.tolist(),
+                                          block.senses.tolist(), block.rhs.tolist())
+                if variable_names is None:
+                    variable_names = [variable.name for variable in model.variable_list]
+            indptr, indices, data, senses, rhs = block_rows[id(block)]
+            start, end = indptr[constraint.row], indptr[constraint.row + 1]
+            if start == end:
+                lhs_str = _constant_str(0.0, fmt)
+            else:
+                lhs_str = _terms_str([variable_names[i] for i in indices[start:end]], data[start:end], fmt)
+            line = f'  {constraint.name}: {lhs_str} {senses[constraint.row]} {_constant_str(rhs[constraint.row], fmt)}'
+
+        else:
+            lhs = constraint._lhs
+            if lhs.var_dict:
+                lhs_str = _terms_str(lhs.var_dict.keys(), lhs.var_dict.values(), fmt)
+            else:
+                lhs_str = _constant_str(lhs.constant, fmt)
+            line = f'  {constraint.name}: {lhs_str} {constraint.mid} {_constant_str(constraint._rhs.constant, fmt)}'
+
+        yield wrap_line(line, max_line_length)
+
+    # Variables
+    # Sort variables
+    bound_statements = []
+    bound_free_statements = []
+    general_statements = []
+    binary_statements = []
+    for variable in model.variables.values():
+        # Integer variables
+        if not variable.continuous:
+            if variable.lower_bound == 0 and variable.upper_bound == 1:
+                binary_statements.append(f'  {variable.name}')
+                # Binary variables need not appear in bounds section
+                continue
+            else:
+                general_statements.append(f'  {variable.name}')
+
+        # Bounds section
+        lower_bound, upper_bound = variable.lower_bound, variable.upper_bound
+        if isinf(lower_bound) and isinf(upper_bound):
+            bound_free_statements.append(f'  {variable.name} free')
+        else:
+            if fmt is not None:
+                lower_bound, upper_bound = fmt(lower_bound), fmt(upper_bound)
+            bound_statements.append(f'  {lower_bound} <= {variable.name} <= {upper_bound}')
+
+    yield 'bounds'
+    yield from bound_statements
+    yield from bound_free_statements
+
+    yield 'general'
+    yield from general_statements
+
+    yield 'binary'
+    yield from binary_statements
+
+    yield 'end'
+
+
+def write_lines(fp, lines, buffer_size=WRITE_BUFFER_SIZE):
+    """
+    Write lines to a file-like object (text or binary), joined into chunks of about buffer_size characters
+    :return: number of characters written
+    """
+    binary = isinstance(fp, (io.RawIOBase, io.BufferedIOBase))
+    n_chars = 0
+    buffer = []
+    buffer_len = 0
+    for line in lines:
+        buffer.append(line)
+        buffer_len += len(line) + 1
+        if buffer_len >= buffer_size:
+            buffer.append('')
+            chunk = '\n'.join(buffer)
+            fp.write(chunk.encode() if binary else chunk)
+            n_chars += len(chunk)
+            buffer = []
+            buffer_len = 0
+
+    if buffer:
+        buffer.append('')
+        chunk = '\n'.join(buffer)
+        fp.write(chunk.encode() if binary else chunk)
+        n_chars += len(chunk)
+
+    return n_chars
+
+
+def write_lp_file(model, filename, directory='.', float_format='repr', max_line_length=LP_MAX_LINE_LENGTH,
+                  buffer_size=WRITE_BUFFER_SIZE):
+    """
+    Write model in LP format
+    :param model: Model object
+    :param filename: filename, or any writable file-like object (text or binary, e.g. a pipe)
+    :param directory: directory for filename
+    :param float_format: 'repr' (default) or '%.17g' are lossless. See get_float_formatter
+    :param max_line_length: long lines are wrapped to this length
+    :param buffer_size: approximate number of characters per write call
+    :return: full filename, or the file-like object
+    """
+    lines = lp_file_lines(model, float_format, max_line_length)
+
+    if hasattr(filename, 'write'):
+        write_lines(filename, lines, buffer_size)
+        return filename
+
+    full_filename = path.join(directory, filename)
     with open(full_filename, 'w') as fp:
+        write_lines(fp, lines, buffer_size)
+
+    return full_filename
+
+def _fixed_mps_number(val):
+    """
+    Format a number within the 12 characters allowed by fixed MPS, at the highest precision which fits
+    """
+    for precision in range(12, 0, -1):
+        val_str = '%.*g' % (precision, val)
+        if len(val_str) <= 12:
+            return val_str
+
+    raise RuntimeError(f'Cannot format {val} in fixed MPS format')
+
+
+def mps_file_lines(model, free=True, float_format='repr'):
+    """
+    Generate the lines of an MPS file describing this model.
+    Maximisation objectives are negated (with a comment), as OBJSENSE is not supported by all readers
+    :param model: Model object
+    :param free: free MPS if True, otherwise fixed MPS (names of at most 8 characters)
+    :param float_format: see get_float_formatter (free MPS only)
+    """
+    if free:
+        fmt = get_float_formatter(float_format) or str
+        def row(row_type, name):
+            return f' {row_type} {name}'
+        def entry(name_1, name_2, val):
+            return f'    {name_1} {name_2} {fmt(val)}'
+        def bound(bound_type, var_name, val=None):
+            return f' {bound_type} BND {var_name}' if val is None else f' {bound_type} BND {var_name} {fmt(val)}'
+        def marker(marker_type):
+            return f"    MARKER 'MARKER' '{marker_type}'"
+    else:
+        fmt = _fixed_mps_number
+        for name in [model.objective.name, *model.constraints, *model.variables]:
+            if len(name) > 8:
+                raise RuntimeError(f'Name "{name}" is longer than the 8 characters allowed in fixed MPS format')
+        def row(row_type, name):
+            return f' {row_type:<2} {name}'
+        def entry(name_1, name_2, val):
+            return f'    {name_1:<8}  {name_2:<8}  {fmt(val):>12}'
+        def bound(bound_type, var_name, val=None):
+            bound_line = f' {bound_type:<2} BND       {var_name:<8}'
+            return bound_line.rstrip() if val is None else f'{bound_line}  {fmt(val):>12}'
+        def marker(marker_type):
+            return f"    MARKER    'MARKER'  '{marker_type}'" # fields 2, 3 and 4
+
+    obj_sign = -1.0 if model.objective.dir == 'max' else 1.0
+    obj_name = model.objective.name
+
+    yield f'NAME          {model.name}'
+    if obj_sign < 0:
+        yield f'* objective {obj_name} negated from max to min'
 
-        # Title section
-        fp.write(f'\ {model.name}\n')
+    # Rows, and the entries of each column
+    yield 'ROWS'
+    yield row('N', obj_name)
+    row_types = {'<=': 'L', '>=': 'G', '=': 'E'}
+    columns = {var_name: [] for var_name in model.variables}
+    for var_name, coef in model.objective.expr.var_dict.items():
+        columns[var_name].append((obj_name, obj_sign * coef))
+
+    rhs_entries = []
+    block_rows = {} # rows of each constraint block as python lists, converted once per block (keyed by object, as block names need not be unique)
+    variable_names = None
+    for constraint in model.constraints.values():
+        yield row(row_types[constraint.mid], constraint.name)
+
+        if isinstance(constraint, flp.BlockConstraint):
+            block = constraint.block
+            if id(block) not in block_rows:
+                block_rows[id(block)] = (block.indptr.tolist(), block.indices.tolist(), block.data.tolist(), block.rhs.tolist())
+                if variable_names is None:
+                    variable_names = [variable.name for variable in model.variable_list]
+            indptr, indices, data, rhs = block_rows[id(block)]
+            start, end = indptr[constraint.row], indptr[constraint.row + 1]
+            for var_index, coef in zip(indices[start:end], data[start:end]):
+                columns[variable_names[var_index]].append((constraint.name, coef))
+            rhs_val = rhs[constraint.row]
 
-        # Objective function
-        fp.write(f'{model.objective.dir}\n')
-        if model.objective.expr.var_dict:
-            fp.write(f'  {model.objective.name}: {model.objective.expr}\n')
         else:
-            fp.write(f'  {model.objective.name}:\n') # omit the constant (because it confuses gurobi_cl)
-
-        # Constraints (printed in rearranged form)
-        fp.write('subject to\n')
-        for constraint in model.constraints.values():
-            fp.write(f'  {constraint.name}: {constraint._lhs} {constraint.mid} {constraint._rhs}\n')
-
-        # Variables
-        # Sort variables
-        bound_statements = []
-        bound_free_statements = []
-        general_statements = []
-        binary_statements = []
-        for variable in model.variables.values():
-            # Integer variables
-            if not variable.continuous:
-                if variable.lower_bound == 0 and variable.upper_bound == 1:
-                    binary_statements.append(f'  {variable.name}')
-                    # Binary variables need not appear in bounds section
-                    continue
+            for var_name, coef in constraint._lhs.var_dict.items():
+                columns[var_name].append((constraint.name, coef))
+            rhs_val = constraint._rhs.constant
+
+        if rhs_val != 0:
+            rhs_entries.append(entry('RHS', constraint.name, rhs_val))
+
+    # Columns, with integer columns between markers
+    yield 'COLUMNS'
+    integer = False
+    for var_name, variable in model.variables.items():
+        if integer == variable.continuous:
+            integer = not integer
+            yield marker('INTORG' if integer else 'INTEND')
+
+        entries = columns[var_name] or [(obj_name, 0.0)] # every column must appear at least once
+        for row_name, coef in entries:
+            yield entry(var_name, row_name, coef)
+
+    if integer:
+        yield marker('INTEND')
+
+    # Right-hand sides. The objective constant is minus the objective row rhs
+    yield 'RHS'
+    constant = model.objective.expr.constant
+    if constant != 0:
+        yield entry('RHS', obj_name, -obj_sign * constant)
+    yield from rhs_entries
+
+    # Bounds, relative to the MPS default of [0, inf)
+    yield 'BOUNDS'
+    for var_name, variable in model.variables.items():
+        lower_bound, upper_bound = variable.lower_bound, variable.upper_bound
+        if not variable.continuous and lower_bound == 0 and upper_bound == 1:
+            yield bound('BV', var_name)
+        elif lower_bound == upper_bound:
+            yield bound('FX', var_name, lower_bound)
+        elif isinf(lower_bound) and isinf(upper_bound):
+            yield bound('FR', var_name)
+        else:
+            if isinf(lower_bound):
+                yield bound('MI', var_name)
+            elif lower_bound != 0 or upper_bound < 0:
+                yield bound('LO', var_name, lower_bound)
+
+            if not isinf(upper_bound):
+                yield bound('UP', var_name, upper_bound)
+            elif not variable.continuous:
+                yield bound('PL', var_name) # integer columns may otherwise default to an upper bound of 1
+
+    yield 'ENDATA'
+
+
+def write_mps_file(model, filename, directory='.', free=True, compress=None, float_format='repr',
+                   buffer_size=WRITE_BUFFER_SIZE):
+    """
+    Write model in MPS format
+    :param model: Model object
+    :param filename: filename, or any writable file-like object (text or binary, e.g. a pipe)
+    :param directory: directory for filename
+    :param free: free MPS if True (default), otherwise fixed MPS
+    :param compress: gzip the output. Default is to compress when filename ends with .gz
+    :param float_format: see get_float_formatter (free MPS only)
+    :param buffer_size: approximate number of characters per write call
+    :return: full filename, or the file-like object
+    """
+    lines = mps_file_lines(model, free, float_format)
+
+    if hasattr(filename, 'write'):
+        write_lines(filename, lines, buffer_size)
+        return filename
+
+    full_filename = path.join(directory, filename)
+    if compress is None:
+        compress = full_filename.endswith('.gz')
+
+    if compress:
+        # fastest compression level, as these files are typically temporary
+        with gzip.open(full_filename, 'wt', compresslevel=1) as fp:
+            write_lines(fp, lines, buffer_size)
+    else:
+        with open(full_filename, 'w') as fp:
+            write_lines(fp, lines, buffer_size)
+
+    return full_filename
+
+
+READ_CHUNK_SIZE = 1 << 22
+
+_LP_COMMENT_RE = re.compile(r'\\[^\n]*')
+# line breaks, operators, numbers, then names. Numbers are matched first so that 3x splits into coefficient and name
+_LP_TOKEN_RE = re.compile(r'\n|<=|>=|=<|=>|[<>=:\[\]+-]|(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?|[^\s<>=:\[\]+-]+')
+_LP_NUMBER_START = frozenset('0123456789.')
+_LP_EOF_TOKENS = ['\n', 'end', '\n', '\n', '\n']
+
+_LP_OPS = {'<=': '<=', '=<': '<=', '<': '<=', '>=': '>=', '=>': '>=', '>': '>=', '=': '='}
+
+_LP_SECTIONS = {
+    'max': 'max', 'maximize': 'max', 'maximise': 'max', 'maximum': 'max',
+    'min': 'min', 'minimize': 'min', 'minimise': 'min', 'minimum': 'min',
+    'st': 'constraints', 's.t.': 'constraints', 'st.': 'constraints', 'subject': 'constraints', 'such': 'constraints',
+    'bounds': 'bounds', 'bound': 'bounds',
+    'general': 'general', 'generals': 'general', 'gen': 'general', 'integer': 'general', 'integers': 'general',
+    'binary': 'binary', 'binaries': 'binary', 'bin': 'binary',
+    'semi-continuous': 'unsupported', 'semis': 'unsupported', 'semi': 'unsupported', 'sos': 'unsupported',
+    'end': 'end',
+}
+
+
+def _lp_chunk_tokens(text):
+    """
+    Tokenize a chunk of complete LP file lines. Comments are dropped, and each line break is kept as a '\n' token
+    so that section keywords can be recognised at line starts
+    """
+    return _LP_TOKEN_RE.findall(_LP_COMMENT_RE.sub('', text))
+
+
+def _lp_number(token):
+    lower = token.lower()
+    if lower in ('inf', 'infinity'):
+        return inf
+    try:
+        return float(token)
+    except ValueError:
+        raise RuntimeError(f'Expected a number in LP file, found "{token}"')
+
+
+class _LpParser:
+    """
+    Parser over a token list which is refilled from the file in large chunks.
+    Each statement (objective, constraint, bound, ...) is parsed from a start position, and if it runs off the end
+    of the token list (IndexError) it is re-parsed after more tokens are read. Results are only stored once a
+    statement completes
+    """
+    def __init__(self, fp, chunk_size):
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.remainder = ''
+        self.tokens = ['\n']
+        self.pos = 0
+        self.eof = False
+
+        self.obj_dir = 'min'
+        self.obj_name = None
+        self.obj_expr = flp.Expression()
+        self.constraints = [] # (name, lhs var_dict, mid, rhs constant)
+        self.lower_bounds = {}
+        self.upper_bounds = {}
+        self.bound_names = {} # dict used as an ordered set
+        self.general = set()
+        self.binary = set()
+
+    def refill(self, min_chunk_size):
+        """
+        Drop consumed tokens and read at least one more chunk of complete lines
+        :return: False if the file is exhausted
+        """
+        if self.eof:
+            return False
+
+        chunk = self.fp.read(min_chunk_size)
+        while chunk and '\n' not in chunk:
+            more = self.fp.read(min_chunk_size)
+            if not more:
+                break
+            chunk += more
+
+        if chunk:
+            split_at = chunk.rfind('\n') + 1
+            text, self.remainder = self.remainder + chunk[:split_at], chunk[split_at:]
+            if not split_at: # final line, with no newline
+                text, self.remainder = text + self.remainder, ''
+            new_tokens = _lp_chunk_tokens(text)
+        else:
+            new_tokens = _lp_chunk_tokens(self.remainder) + _LP_EOF_TOKENS
+            self.eof = True
+
+        self.tokens = self.tokens[self.pos:] + new_tokens
+        self.pos = 0
+        return True
+
+    def section_at(self, i):
+        """
+        :return: section name if tokens[i] is a section keyword at the start of a line, else None
+        """
+        if self.tokens[i - 1] != '\n' or self.tokens[i + 1] == ':':
+            return None
+        return _LP_SECTIONS.get(self.tokens[i].lower())
+
+    def parse_expr(self, i):
+        """
+        Parse linear terms from tokens[i] until an operator, or a label or section keyword at the start of a line
+        :return: (position after the expression, var_dict, constant)
+        """
+        tokens = self.tokens
+        var_dict = {}
+        constant = 0.0
+        sign = 1.0
+        pending = None # signed coefficient awaiting its variable
+        while True:
+            token = tokens[i]
+            first = token[0]
+            if token == '\n':
+                next_token = tokens[i + 1]
+                if tokens[i + 2] == ':' or (next_token.lower() in _LP_SECTIONS and next_token != '\n'):
+                    break
+            elif first in '+-':
+                if pending is not None:
+                    constant += pending
+                    pending = None
+                if first == '-':
+                    sign = -sign
+            elif first in _LP_NUMBER_START:
+                if pending is not None:
+                    raise RuntimeError(f'Unexpected number "{token}" in LP file expression')
+                pending = sign * float(token)
+                sign = 1.0
+            elif first in '<>=:':
+                break
+            elif first in '[]':
+                raise RuntimeError('Quadratic expressions are not supported')
+            else:
+                coef = sign if pending is None else pending
+                if token in var_dict:
+                    var_dict[token] += coef
                 else:
-                    general_statements.append(f'  {variable.name}')
+                    var_dict[token] = coef
+                pending = None
+                sign = 1.0
+            i += 1
+
+        if pending is not None:
+            constant += pending
+        return i, var_dict, constant
+
+    def skip_newlines(self, i):
+        while self.tokens[i] == '\n':
+            i += 1
+        return i
+
+    def parse_label(self, i):
+        if self.tokens[i + 1] == ':':
+            return i + 2, self.tokens[i]
+        return i, None
+
+    def parse_number(self, i):
+        """
+        Parse an optionally signed number, including infinity
+        """
+        tokens = self.tokens
+        sign = 1.0
+        while tokens[i] in ('+', '-', '\n'):
+            if tokens[i] == '-':
+                sign = -sign
+            i += 1
+        return i + 1, sign * _lp_number(tokens[i])
+
+    def parse_constraint(self, i):
+        i, name = self.parse_label(i)
+        i, var_dict, constant = self.parse_expr(i)
+        i = self.skip_newlines(i)
+        op = _LP_OPS.get(self.tokens[i])
+        if op is None:
+            raise RuntimeError(f'Expected an inequality in LP file constraint {name}, found "{self.tokens[i]}"')
+        i, rhs = self.parse_number(i + 1)
+        self.constraints.append((name, var_dict, op, rhs - constant))
+        return i
+
+    def set_bound(self, name, op, val):
+        self.bound_names[name] = None
+        if op != '>=':
+            self.upper_bounds[name] = val
+        if op != '<=':
+            self.lower_bounds[name] = val
 
-            # Bounds section
-            if isinf(variable.lower_bound) and isinf(variable.upper_bound):
-                bound_free_statements.append(f'  {variable.name} free')
+    def parse_bound(self, i):
+        tokens = self.tokens
+        token = tokens[i]
+        if token[0] not in _LP_NUMBER_START and token not in ('+', '-') and token.lower() not in ('inf', 'infinity'):
+            # name free | name op val
+            name, token = token, tokens[i + 1]
+            if token.lower() == 'free':
+                bounds = [(name, '>=', -inf), (name, '<=', inf)]
+                i += 2
+            elif token in _LP_OPS:
+                i, val = self.parse_number(i + 2)
+                bounds = [(name, _LP_OPS[token], val)]
             else:
-                bound_statements.append(f'  {variable.lower_bound} <= {variable.name} <= {variable.upper_bound}')
+                raise RuntimeError(f'Unexpected "{token}" in LP file bound for {name}')
+        else:
+            # val op name [op val], where the first op is mirrored
+            i, val = self.parse_number(i)
+            op, name = _LP_OPS[tokens[i]], tokens[i + 1]
+            bounds = [(name, {'<=': '>=', '>=': '<=', '=': '='}[op], val)]
+            i += 2
+            if tokens[i] in _LP_OPS:
+                op = _LP_OPS[tokens[i]]
+                i, val = self.parse_number(i + 1)
+                bounds.append((name, op, val))
 
-        fp.write('bounds\n')
-        fp.write('\n'.join(bound_statements) + '\n')
-        fp.write('\n'.join(bound_free_statements) + '\n')
+        for bound in bounds:
+            self.set_bound(*bound)
+        return i
 
-        fp.write('general\n')
-        fp.write('\n'.join(general_statements) + '\n')
+    def parse_statement(self, i, section):
+        """
+        Parse one statement from tokens[i]
+        :return: (position after the statement, current section)
+        """
+        i = self.skip_newlines(i)
+        new_section = self.section_at(i)
+        if new_section is not None:
+            if self.tokens[i].lower() in ('subject', 'such'):
+                i += 1 # 'to' / 'that'
+            i += 1
 
-        fp.write('binary\n')
-        fp.write('\n'.join(binary_statements) + '\n')
+            if new_section in ('max', 'min'):
+                i = self.skip_newlines(i)
+                i, obj_name = self.parse_label(i)
+                i, var_dict, constant = self.parse_expr(i)
+                self.obj_dir, self.obj_name = new_section, obj_name
+                self.obj_expr = flp.Expression.from_var_dict(var_dict, constant)
+            elif new_section == 'unsupported':
+                raise RuntimeError('Semi-continuous variables and SOS constraints are not supported')
+            return i, new_section
 
-        fp.write('end\n')
+        if section == 'constraints':
+            i = self.parse_constraint(i)
+        elif section == 'bounds':
+            i = self.parse_bound(i)
+        elif section in ('general', 'binary'):
+            (self.general if section == 'general' else self.binary).add(self.tokens[i])
+            i += 1
+        else:
+            raise RuntimeError(f'Unexpected "{self.tokens[i]}" in LP file outside of any section')
+
+        return i, section
+
+    def parse(self):
+        section = None
+        chunk_size = self.chunk_size
+        while section != 'end':
+            try:
+                self.pos, section = self.parse_statement(self.pos, section)
+                chunk_size = self.chunk_size
+            except IndexError:
+                # statement continues beyond the tokens read so far. Read more (growing, for very long statements)
+                if not self.refill(chunk_size):
+                    raise RuntimeError('Unexpected end of LP file')
+                chunk_size *= 2
+
+        return self
+
+    def build_model(self, model_name=None):
+        model = flp.Model(model_name)
+
+        # variables in order of appearance
+        var_names = dict(self.obj_expr.var_dict)
+        for _, var_dict, _, _ in self.constraints:
+            var_names.update(var_dict)
+        var_names.update(self.bound_names)
+        var_names.update(dict.fromkeys(self.general))
+        var_names.update(dict.fromkeys(self.binary))
+
+        variables = []
+        for name in var_names:
+            if name in self.binary:
+                variables.append(flp.variable.Binary(name))
+            else:
+                lower_bound = self.lower_bounds.get(name, 0.0)
+                upper_bound = self.upper_bounds.get(name, inf)
+                if name in self.general:
+                    variables.append(flp.variable.Integer(name, lower_bound, upper_bound))
+                else:
+                    variables.append(flp.variable.Continuous(name, lower_bound, upper_bound))
+        model.add_variables(*variables)
+
+        model.add_objective(flp.Objective(self.obj_dir, self.obj_expr, self.obj_name))
+        model.add_constraints(*(flp.Constraint.from_rearranged(flp.Expression.from_var_dict(var_dict), mid, rhs_constant, name)
+                                for name, var_dict, mid, rhs_constant in self.constraints))
+        return model
+
+
+def read_lp_file(filename, directory='.', chunk_size=READ_CHUNK_SIZE):
+    """
+    Read an LP file into a new Model.
+    Quadratic terms, semi-continuous variables and SOS constraints are not supported,
+    and all names must be valid pyflip names (see util.verify_valid_name)
+    :param filename: filename, or any readable text file-like object
+    :param directory: directory for filename
+    :param chunk_size: number of characters read and tokenized at a time
+    :return: Model
+    """
+    if hasattr(filename, 'read'):
+        return _read_lp(filename, chunk_size)
+
+    with open(path.join(directory, filename), 'r') as fp:
+        return _read_lp(fp, chunk_size)
+
+def _read_lp(fp, chunk_size):
+    # the title comment written by write_lp_file holds the model name
+    first_line = fp.readline()
+    model_name = first_line[1:].strip() if first_line.startswith('\\') else ''
+    if not model_name.isidentifier():
+        model_name = None
+
+    parser = _LpParser(fp, chunk_size)
+    parser.remainder = first_line
+    return parser.parse().build_model(model_name)
+
+
+_MPS_NEGATED_OBJECTIVE_RE = re.compile(r'\* objective (\S+) negated from max to min')
+_MPS_ROW_SENSES = {'L': '<=', 'G': '>=', 'E': '='}
+_MPS_VALUELESS_BOUNDS = frozenset(('FR', 'MI', 'PL', 'BV'))
+
+
+def _fixed_mps_fields(line):
+    """
+    Split a fixed MPS data line by column position (allowing spaces in names), dropping empty fields
+    """
+    fields = (line[1:3], line[4:12], line[14:22], line[24:36], line[39:47], line[49:61])
+    return [field.strip() for field in fields if field.strip()]
+
+
+def read_mps_file(filename, directory='.', free=True):
+    """
+    Read a free or fixed MPS file into a new Model.
+    Constraints are loaded straight into a single ConstraintBlock (requires numpy), so no Expression is built per row
+    until one is requested. RANGES, semi-continuous bounds and SOS sections are not supported.
+    A max objective negated by write_mps_file is restored
+    :param filename: filename (gzipped if it ends with .gz), or any readable text file-like object
+    :param directory: directory for filename
+    :param free: free MPS if True (default), otherwise fixed MPS
+    :return: Model
+    """
+    if hasattr(filename, 'read'):
+        return _read_mps(filename, free)
+
+    full_filename = path.join(directory, filename)
+    if full_filename.endswith('.gz'):
+        with gzip.open(full_filename, 'rt') as fp:
+            return _read_mps(fp, free)
+
+    with open(full_filename, 'r') as fp:
+        return _read_mps(fp, free)
+
+class _MpsParser:
+    """
+    Reads an MPS file section by section. Each section is read by its own loop over the remaining lines,
+    which returns the next section header line
+    """
+    def __init__(self, fp, free):
+        self.fp = fp
+        self.split = str.split if free else _fixed_mps_fields
+
+        self.model_name = None
+        self.negated_obj_name = None
+        self.obj_dir = 'min'
+        self.obj_name = None
+
+        self.row_index = {} # constraint name -> row
+        self.senses = []
+        self.other_obj_rows = set() # N rows after the first are free rows, which are dropped
+
+        self.col_index = {} # variable name -> column
+        self.col_integer = []
+        self.obj_coefs = {}
+        self.rows, self.cols, self.vals = array('q'), array('q'), array('d')
+
+        self.rhs = None
+        self.obj_constant = 0.0
+        self.lower_bounds = {}
+        self.upper_bounds = {}
+        self.binary = set()
+
+    def data_lines(self):
+        """
+        Yield the field lists of data lines, stopping at (and storing) the next section header
+        """
+        split = self.split
+        for line in self.fp:
+            if line[0] in ' \t':
+                if line.strip():
+                    yield line.split() if "'MARKER'" in line else split(line)
+            elif line[0] == '*':
+                match = _MPS_NEGATED_OBJECTIVE_RE.match(line)
+                if match:
+                    self.negated_obj_name = match.group(1)
+            elif line.strip():
+                self.header = line
+                return
+
+        self.header = 'ENDATA'
+
+    def parse(self):
+        self.header = None
+        for _ in self.data_lines(): # comments before the first section
+            raise RuntimeError('Unexpected data line outside of any MPS section')
+
+        while True:
+            fields = self.header.split()
+            section = fields[0].upper()
+            if section == 'NAME':
+                if len(fields) > 1 and fields[1].isidentifier():
+                    self.model_name = fields[1]
+                for _ in self.data_lines():
+                    pass
+            elif section == 'OBJSENSE':
+                if len(fields) > 1:
+                    self.obj_dir = fields[1][:3].lower()
+                for fields in self.data_lines():
+                    self.obj_dir = fields[0][:3].lower()
+            elif section == 'ROWS':
+                self.read_rows()
+            elif section == 'COLUMNS':
+                self.read_columns()
+            elif section == 'RHS':
+                self.read_rhs()
+            elif section == 'BOUNDS':
+                self.read_bounds()
+            elif section == 'ENDATA':
+                return self
+            else:
+                raise RuntimeError(f'MPS section {section} is not supported')
+
+    def read_rows(self):
+        row_index, senses = self.row_index, self.senses
+        for row_type, row_name in self.data_lines():
+            row_type = row_type.upper()
+            if row_type == 'N':
+                if self.obj_name is None:
+                    self.obj_name = row_name
+                else:
+                    self.other_obj_rows.add(row_name)
+            elif row_type in _MPS_ROW_SENSES:
+                row_index[row_name] = len(senses)
+                senses.append(_MPS_ROW_SENSES[row_type])
+            else:
+                raise RuntimeError(f'Unrecognised row type {row_type} in MPS file')
+
+    def read_columns(self):
+        row_index, col_index, col_integer, obj_coefs = self.row_index, self.col_index, self.col_integer, self.obj_coefs
+        rows_append, cols_append, vals_append = self.rows.append, self.cols.append, self.vals.append
+        obj_name = self.obj_name
+        integer = False
+        col_name = col = None
+        for fields in self.data_lines():
+            if fields[0] != col_name:
+                if fields[1] == "'MARKER'":
+                    integer = fields[2] == "'INTORG'"
+                    continue
+
+                col_name = fields[0]
+                col = col_index.get(col_name)
+                if col is None:
+                    col = col_index[col_name] = len(col_integer)
+                    col_integer.append(integer)
+
+            for i in range(1, len(fields), 2):
+                row_name = fields[i]
+                row = row_index.get(row_name)
+                if row is not None:
+                    rows_append(row)
+                    cols_append(col)
+                    vals_append(float(fields[i + 1]))
+                elif row_name == obj_name:
+                    obj_coefs[col_name] = obj_coefs.get(col_name, 0.0) + float(fields[i + 1])
+                elif row_name not in self.other_obj_rows:
+                    raise RuntimeError(f'Unrecognised row {row_name} in MPS file column {col_name}')
+
+    def read_rhs(self):
+        self.rhs = rhs = np.zeros(len(self.senses))
+        for fields in self.data_lines():
+            # the rhs set name is optional
+            for i in range(len(fields) % 2, len(fields), 2):
+                row_name = fields[i]
+                row = self.row_index.get(row_name)
+                if row is not None:
+                    rhs[row] = float(fields[i + 1])
+                elif row_name == self.obj_name:
+                    self.obj_constant = -float(fields[i + 1])
+                elif row_name not in self.other_obj_rows:
+                    raise RuntimeError(f'Unrecognised row {row_name} in MPS file RHS')
+
+    def read_bounds(self):
+        lower_bounds, upper_bounds = self.lower_bounds, self.upper_bounds
+        for fields in self.data_lines():
+            bound_type = fields[0].upper()
+            # the bound set name is optional
+            if bound_type in _MPS_VALUELESS_BOUNDS and len(fields) <= 3:
+                col_name, val = fields[-1], None
+            else:
+                col_name, val = fields[-2], float(fields[-1])
+
+            if col_name not in self.col_index:
+                raise RuntimeError(f'Unrecognised column {col_name} in MPS file BOUNDS')
+
+            if bound_type in ('UP', 'UI'):
+                if val < 0 and col_name not in lower_bounds:
+                    lower_bounds[col_name] = -inf # conventional, as the default lower bound of 0 would be infeasible
+                upper_bounds[col_name] = val
+            elif bound_type in ('LO', 'LI'):
+                lower_bounds[col_name] = val
+            elif bound_type == 'FX':
+                lower_bounds[col_name] = upper_bounds[col_name] = val
+            elif bound_type == 'FR':
+                lower_bounds[col_name], upper_bounds[col_name] = -inf, inf
+            elif bound_type == 'MI':
+                lower_bounds[col_name] = -inf
+            elif bound_type == 'PL':
+                upper_bounds[col_name] = inf
+            elif bound_type == 'BV':
+                self.binary.add(col_name)
+            else:
+                raise RuntimeError(f'MPS bound type {bound_type} is not supported')
+
+            if bound_type in ('UI', 'LI'):
+                self.col_integer[self.col_index[col_name]] = True
+
+    def build_model(self):
+        model = flp.Model(self.model_name)
+
+        # variables, defaulting to [0, inf)
+        variables = []
+        for col_name, col_is_integer in zip(self.col_index, self.col_integer):
+            lower_bound = self.lower_bounds.get(col_name, 0.0)
+            upper_bound = self.upper_bounds.get(col_name, inf)
+            if col_name in self.binary or (col_is_integer and lower_bound == 0 and upper_bound == 1):
+                variables.append(flp.variable.Binary(col_name))
+            elif col_is_integer:
+                variables.append(flp.variable.Integer(col_name, lower_bound, upper_bound))
+            else:
+                variables.append(flp.variable.Continuous(col_name, lower_bound, upper_bound))
+        model.add_variable_block(variables, list(self.col_index))
+
+        obj_dir = self.obj_dir
+        obj_expr = flp.Expression.from_var_dict(self.obj_coefs, self.obj_constant)
+        if self.negated_obj_name is not None and self.negated_obj_name == self.obj_name:
+            obj_expr *= -1
+            obj_dir = 'max'
+        model.add_objective(flp.Objective(obj_dir, obj_expr, self.obj_name))
+
+        if self.senses:
+            rhs = self.rhs if self.rhs is not None else np.zeros(len(self.senses))
+            coo = (np.frombuffer(self.rows, dtype=np.int64), np.frombuffer(self.cols, dtype=np.int64),
+                   np.frombuffer(self.vals, dtype=np.float64))
+            model.add_constraints_from_matrix(coo, self.senses, rhs, names=list(self.row_index))
+
+        return model
 
-    return full_filename
 
-def read_lp_file(model):
-    #TODO
-    raise NotImplementedError
\ No newline at end of file
+def _read_mps(fp, free):
+    flp.util.require_module(np, 'numpy')
+    return _MpsParser(fp, free).parse().build_model()
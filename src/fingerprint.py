@@ -0,0 +1,53 @@
+"""
+Stable content hashes of models, independent of the order in which variables and constraints were added
+"""
+from hashlib import blake2b
+
+import pyflip as flp
+
+FINGERPRINT_MODULUS = 1 << 128
+
+
+def _item_hash(text):
+    """
+    :return: 128-bit integer hash of the canonical text of one model item
+    """
+    return int.from_bytes(blake2b(text.encode(), digest_size=16).digest(), 'little')
+
+def _terms_text(var_dict):
+    return ' '.join(f'{name}:{float(coef)!r}' for name, coef in sorted(var_dict.items()) if coef != 0)
+
+def variable_hash(var):
+    return _item_hash(f'v|{var.name}|{int(bool(var.continuous))}|{float(var.lower_bound)!r}|{float(var.upper_bound)!r}')
+
+def constraint_hash(con):
+    """
+    Constraints are hashed in rearranged form (variables on the left, constant on the right), without their names
+    """
+    if isinstance(con, flp.BlockConstraint):
+        block, row = con.block, con.row
+        start, end = block.indptr[row], block.indptr[row + 1]
+        variable_list = block.model.variable_list
+        var_dict = {variable_list[i].name: coef for i, coef in zip(block.indices[start:end].tolist(), block.data[start:end].tolist())}
+        return _item_hash(f'c|{block.senses[row]}|{float(block.rhs[row])!r}|{_terms_text(var_dict)}')
+    return _item_hash(f'c|{con.mid}|{float(con._rhs.constant - con._lhs.constant)!r}|{_terms_text(con._lhs.var_dict)}')
+
+def objective_hash(objective):
+    return _item_hash(f'o|{objective.dir}|{float(objective.expr.constant)!r}|{_terms_text(objective.expr.var_dict)}')
+
+def format_fingerprint(total):
+    return f'{total % FINGERPRINT_MODULUS:032x}'
+
+
+def model_fingerprint(model):
+    """
+    Hash of a model's variables (with bounds and types), constraints and objective, computed from scratch.
+    Model.fingerprint() gives the same value, kept up to date as the model is built.
+    Each item is hashed separately and the hashes added up, so the order in which items were added doesn't matter.
+    Names of the model and its constraints are not included
+    :return: hex string
+    """
+    total = sum(variable_hash(var) for var in model.variable_list)
+    total += sum(constraint_hash(con) for con in model.constraints.values())
+    total += objective_hash(model.objective)
+    return format_fingerprint(total)
@@ -1,9 +1,17 @@
 from itertools import count
 from enum import Enum
-from collections import Iterable
+from collections.abc import Iterable
+from numbers import Integral
+from math import inf
+
+try:
+    import numpy as np
+except ImportError: # numpy is an optional dependency, only required for array-backed features
+    np = None
 
 import pyflip as flp
 from .variable import Variable
+from .fingerprint import variable_hash, constraint_hash, objective_hash, format_fingerprint
 
 class Model:
     counter = count()
@@ -14,25 +22,84 @@ class Model:
         flp.util.verify_valid_name(name)
         self.name = name
         self.variables = {}
+        self.variable_list = [] # variables by integer index, in order of addition
+        self.var_index = {} # variable name -> integer index
         self.objective = Objective()
         self.constraints = {}
+        self.constraint_blocks = []
+
+        # parts of the fingerprint, kept up to date as items are added once fingerprint() has first been called
+        self._content_hash = None # constraints and objective
+        self._variable_hash = None
+        self._variable_mutations = None # Variable.mutations when the variables were last hashed
 
     def add_variables(self, *variables, overwrite=False):
         """
         :param variables: a pyflip.variable.Variable object, or iterable
         :param substitute: boolean for whether to allow overwriting existing model variables (by name)
+
+        Each new variable is assigned the next integer index (see var_index), as used by ArrayExpression
         """
         for variable in variables:
-            if (variable.name not in self.variables) or overwrite:
+            if variable.name not in self.variables:
+                self.var_index[variable.name] = len(self.variable_list)
+                self.variable_list.append(variable)
+                self.variables[variable.name] = variable
+                if self._variable_hash is not None:
+                    self._variable_hash += variable_hash(variable)
+            elif overwrite:
+                # an overwritten variable keeps the index of the variable it replaces
+                if self._variable_hash is not None:
+                    self._variable_hash += variable_hash(variable) - variable_hash(self.variables[variable.name])
+                self.variable_list[self.var_index[variable.name]] = variable
                 self.variables[variable.name] = variable
             else:
                 raise RuntimeError(f'A variable named {variable.name} already exists in this model')
 
+    def add_var_array(self, shape, kind=None, lower_bound=-inf, upper_bound=inf, name=None):
+        """
+        Create and add a family of variables in one call
+        :param shape: int, tuple of ints, or tuple of index sets (iterables of labels used in variable names)
+        :param kind: pyflip.variable.Continuous (default), Integer or Binary
+        :param lower_bound: scalar or array broadcastable to the shape
+        :param upper_bound: scalar or array broadcastable to the shape
+        :param name: base name of the variables
+        :return: pyflip.variable.VariableArray
+        """
+        if isinstance(shape, Integral):
+            shape = (shape,)
+        index_sets = [range(dim) if isinstance(dim, Integral) else dim for dim in shape]
+
+        return flp.variable.VariableArray(self, index_sets, kind or flp.variable.Continuous, lower_bound, upper_bound, name)
+
+    def add_variable_block(self, variables, names):
+        """
+        Bulk version of add_variables for new, uniquely named variables
+        :param variables: list of Variable objects
+        :param names: list of their names
+        :return: integer index of the first variable
+        """
+        if not self.variables.keys().isdisjoint(names):
+            duplicate_name = next(name for name in names if name in self.variables)
+            raise RuntimeError(f'A variable named {duplicate_name} already exists in this model')
+        if len(set(names)) < len(names):
+            raise RuntimeError('Variable names within a block must be unique')
+
+        start = len(self.variable_list)
+        self.variable_list.extend(variables)
+        self.var_index.update(zip(names, range(start, start + len(names))))
+        self.variables.update(zip(names, variables))
+        if self._variable_hash is not None:
+            self._variable_hash += sum(map(variable_hash, variables))
+        return start
+
     def add_objective(self, objective):
         """
         :param objective: a pyflip.Objective object
         """
         self.test_defined_variables(objective.expr)
+        if self._content_hash is not None:
+            self._content_hash += objective_hash(objective) - objective_hash(self.objective)
         self.objective = objective
 
     def add_constraints(self, *constraints, overwrite=False):
@@ -44,10 +111,39 @@ class Model:
             if (constraint.name not in self.constraints) or overwrite:
                 self.test_defined_variables(constraint.lhs)
                 self.test_defined_variables(constraint.rhs)
+                if self._content_hash is not None:
+                    self._content_hash += constraint_hash(constraint)
+                    if constraint.name in self.constraints:
+                        self._content_hash -= constraint_hash(self.constraints[constraint.name])
                 self.constraints[constraint.name] = constraint
             else:
                 raise RuntimeError(f'A constraint named {constraint.name} already exists in this model')
 
+    def add_constraints_from_matrix(self, A, senses, b, names=None, name=None):
+        """
+        Add the constraints A x (senses) b in one step, stored in columnar (CSR) form as a ConstraintBlock.
+        Columns of A correspond to model variables by integer index (see var_index)
+        :param A: scipy sparse matrix, dense 2-D array, or COO triple (rows, cols, vals). Duplicate entries are summed
+        :param senses: '<=', '=' or '>=', or a sequence of these with one per row
+        :param b: right-hand-side values, one per row. A scalar is broadcast to all rows, but then for a COO triple
+            the number of rows is taken from senses or names
+        :param names: optional list of constraint names. Default is name_0, name_1, ...
+        :param name: name of the block
+        :return: ConstraintBlock
+        """
+        block = ConstraintBlock.from_matrix(self, A, senses, b, names, name)
+        if block.indices.size and (block.indices.min() < 0 or block.indices.max() >= len(self.variable_list)):
+            raise RuntimeError('Constraint matrix refers to a column with no model variable. Variables must be added to model before a dependent constraint')
+        if not self.constraints.keys().isdisjoint(block.names):
+            duplicate_name = next(name for name in block.names if name in self.constraints)
+            raise RuntimeError(f'A constraint named {duplicate_name} already exists in this model')
+
+        self.constraints.update(zip(block.names, block.constraints))
+        self.constraint_blocks.append(block)
+        if self._content_hash is not None:
+            self._content_hash += sum(map(constraint_hash, block.constraints))
+        return block
+
     def test_defined_variables(self, expr):
         """
         Tests that all variables using in an expression are defined in the model
@@ -65,6 +161,38 @@ class Model:
         """
         return all(con.is_satisfied(soln) for con in self.constraints.values())
 
+    def fingerprint(self):
+        """
+        Hash of the model's variables (with bounds and types), constraints and objective, as for flp.model_fingerprint,
+        e.g. to check whether a model has changed. The first call hashes the whole model. After that the hash
+        is updated as items are added, so later calls take constant time (until a variable's bounds or type change,
+        when the variables are hashed again). In-place changes to a constraint or objective that is already
+        in the model are not tracked
+        :return: hex string
+        """
+        if self._content_hash is None:
+            self._content_hash = sum(map(constraint_hash, self.constraints.values())) + objective_hash(self.objective)
+        if self._variable_mutations != Variable.mutations:
+            self._variable_hash = sum(map(variable_hash, self.variable_list))
+            self._variable_mutations = Variable.mutations
+        return format_fingerprint(self._content_hash + self._variable_hash)
+
+    def compile(self):
+        """
+        Snapshot the constraints and objective as arrays, for fast evaluation of many solutions (requires numpy)
+        :return: CompiledModel
+        """
+        return flp.CompiledModel(self)
+
+    def profile(self, family=None):
+        """
+        Profile building this model, e.g. with model.profile() as profile: ... (see BuildProfile)
+        :param family: function of a constraint name, returning the family to report it under.
+            Default strips trailing _<number> indices
+        :return: BuildProfile
+        """
+        return flp.BuildProfile(self, family or flp.constraint_family)
+
     def num_vars(self):
         return len(self.variables)
 
@@ -142,6 +270,26 @@ class Constraint:
         self._lhs, self._rhs = flp.Expression.rearrange_ineq(lhs, rhs)
         # self._name = self.name.replace('')
 
+    @classmethod
+    def from_rearranged(cls, lhs, mid, rhs_constant, name=None):
+        """
+        Build a constraint already in rearranged form (variables on the left, constant on the right) without copying lhs.
+        The lhs Expression is shared between lhs and _lhs, so should not be modified afterwards
+        :param lhs: Expression with zero constant
+        :param mid: '<=', '=' or '>='
+        :param rhs_constant: number
+        """
+        self = cls.__new__(cls)
+        if name is None:
+            name = f'con_{next(Constraint.counter)}'
+
+        flp.util.verify_valid_name(name)
+        self.lhs = self._lhs = lhs
+        self.rhs = self._rhs = flp.Expression(rhs_constant)
+        self.mid = mid
+        self.name = name
+        return self
+
     def is_satisfied(self, soln):
         """
         Check whether this constraint is satisfied in given solution
@@ -159,6 +307,156 @@ class Constraint:
         return f'{self.name}: {self.lhs} {self.mid} {self.rhs}'
 
 
+class ConstraintBlock:
+    """
+    Block of constraints stored in columnar form: a CSR matrix over model variable indices, senses and right-hand sides.
+    Each row is exposed to the rest of pyflip as a BlockConstraint, whose expressions are only built on request
+    """
+    counter = count()
+    def __init__(self, model, indptr, indices, data, senses, rhs, names=None, name=None):
+        flp.util.require_module(np, 'numpy')
+        if name is None:
+            name = f'con_block_{next(ConstraintBlock.counter)}'
+        flp.util.verify_valid_name(name)
+
+        self.model = model
+        self.name = name
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.data = np.asarray(data, dtype=np.float64)
+        n_rows = len(self.indptr) - 1
+
+        self.rhs = np.array(np.broadcast_to(np.asarray(rhs, dtype=np.float64), (n_rows,)))
+        self.senses = np.array(np.broadcast_to(np.asarray(senses, dtype='<U2'), (n_rows,)))
+        valid_senses = [eq.value for eq in ConstraintEq]
+        if not np.isin(self.senses, valid_senses).all():
+            raise RuntimeError(f'Constraint senses must be one of {valid_senses}')
+
+        if names is None:
+            self.names = [f'{name}_{i}' for i in range(n_rows)]
+        else:
+            self.names = list(names)
+            if len(self.names) != n_rows:
+                raise RuntimeError(f'Expected {n_rows} constraint names, got {len(self.names)}')
+            for con_name in self.names:
+                flp.util.verify_valid_name(con_name)
+        if len(set(self.names)) < n_rows:
+            raise RuntimeError('Constraint names within a block must be unique')
+
+        with flp.util.gc_paused():
+            self.constraints = [BlockConstraint(self, row, con_name) for row, con_name in enumerate(self.names)]
+
+    @classmethod
+    def from_matrix(cls, model, A, senses, b, names=None, name=None):
+        """
+        :param A: scipy sparse matrix, dense 2-D array, or COO triple (rows, cols, vals)
+        """
+        flp.util.require_module(np, 'numpy')
+        b = np.asarray(b, dtype=np.float64)
+
+        if hasattr(A, 'tocsr'): # scipy sparse
+            A = A.tocsr(copy=True) # the block must not share (or normalise) the caller's arrays
+            A.sum_duplicates()
+            n_rows = A.shape[0]
+            if b.ndim and len(b) != n_rows:
+                raise RuntimeError(f'Constraint matrix has {n_rows} rows but {len(b)} right-hand-side values')
+            return cls(model, A.indptr, A.indices, A.data, senses, b, names, name)
+
+        if isinstance(A, tuple) and len(A) == 3: # COO triple
+            rows, cols, vals = (np.asarray(arr) for arr in A)
+            # the triple doesn't define the number of rows (trailing rows may be empty), so it must come from elsewhere
+            if b.ndim:
+                n_rows = len(b)
+            elif not isinstance(senses, str):
+                n_rows = len(senses)
+            elif names is not None:
+                n_rows = len(names)
+            else:
+                raise RuntimeError('For a COO constraint matrix, give right-hand-side values, senses or names for each row')
+        else: # dense
+            A = np.asarray(A, dtype=np.float64)
+            n_rows = A.shape[0]
+            if A.ndim != 2 or (b.ndim and len(b) != n_rows):
+                raise RuntimeError(f'Constraint matrix of shape {A.shape} does not match the right-hand-side values')
+            rows, cols = np.nonzero(A)
+            vals = A[rows, cols]
+
+        rows = rows.astype(np.int64)
+        cols = cols.astype(np.int64)
+        vals = vals.astype(np.float64)
+        if not (rows.shape == cols.shape == vals.shape):
+            raise RuntimeError('COO rows, cols and vals must have the same length')
+        if rows.size and (rows.min() < 0 or rows.max() >= n_rows):
+            raise RuntimeError(f'Constraint matrix row index out of range for {n_rows} rows')
+
+        # sort by row then column, and sum duplicate entries
+        order = np.lexsort((cols, rows))
+        rows, cols, vals = rows[order], cols[order], vals[order]
+        if rows.size:
+            is_new = np.empty(rows.size, dtype=bool)
+            is_new[0] = True
+            np.not_equal(rows[1:], rows[:-1], out=is_new[1:])
+            is_new[1:] |= cols[1:] != cols[:-1]
+            starts = np.flatnonzero(is_new)
+            rows, cols, vals = rows[starts], cols[starts], np.add.reduceat(vals, starts)
+
+        indptr = np.zeros(n_rows + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n_rows), out=indptr[1:])
+        return cls(model, indptr, cols, vals, senses, b, names, name)
+
+    def num_rows(self):
+        return len(self.indptr) - 1
+
+    def row_array_expression(self, row):
+        """
+        :return: ArrayExpression of the left-hand side of a row (copied, as in-place operators would modify the block)
+        """
+        start, end = self.indptr[row], self.indptr[row + 1]
+        return flp.ArrayExpression.from_arrays(self.model, self.indices[start:end].copy(), self.data[start:end].copy())
+
+    def row_expression(self, row):
+        """
+        :return: Expression of the left-hand side of a row
+        """
+        start, end = self.indptr[row], self.indptr[row + 1]
+        variable_list = self.model.variable_list
+        expr = flp.Expression()
+        for var_index, coef in zip(self.indices[start:end].tolist(), self.data[start:end].tolist()):
+            expr.add_term(coef, variable_list[var_index])
+
+        return expr
+
+    def __repr__(self):
+        return f'{self.name} with {self.num_rows()} cons, {len(self.data)} nonzeros'
+
+
+class BlockConstraint(Constraint):
+    """
+    Row of a ConstraintBlock. Its expressions are built from the block arrays on each access (and are not cached)
+    """
+    def __init__(self, block, row, name):
+        # Constraint.__init__ is bypassed: the block holds the rearranged form lhs (mid) constant
+        self.block = block
+        self.row = row
+        self.name = name
+
+    @property
+    def lhs(self):
+        return self.block.row_expression(self.row)
+
+    @property
+    def rhs(self):
+        return flp.Expression(float(self.block.rhs[self.row]))
+
+    @property
+    def mid(self):
+        return str(self.block.senses[self.row])
+
+    # rows are already in rearranged form
+    _lhs = lhs
+    _rhs = rhs
+
+
 class ConstraintEq(Enum):
     LEQ = '<='
     EQ = '='
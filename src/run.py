@@ -1,42 +1,164 @@
 from time import perf_counter
 from enum import Enum
+from collections import deque, namedtuple
+from array import array
+from math import isnan, nan
+from contextlib import contextmanager
+import csv
+import os
+
+try:
+    import numpy as np
+except ImportError: # numpy is an optional dependency, only required for array-backed features
+    np = None
 
 import pyflip as flp
 
+# A solver progress update. Fields the solver hasn't reported yet are None
+ProgressEvent = namedtuple('ProgressEvent', ('time', 'primal', 'dual', 'gap', 'nodes'))
+
+
 class Run:
     """
     Solver run context manager providing timer etc
     """
-    def __init__(self, name_prefix='', solver_name='', params=None):
+    log_max_lines = 10000 # only the latest log lines are kept in memory. The log file has the full log
+
+    def __init__(self, name_prefix='', solver_name='', params=None, progress_parser=None, on_log_line=None, on_progress=None,
+                 hooks=()):
+        """
+        :param progress_parser: function of a log line, returning a dict of any ProgressEvent fields found in it
+        :param on_log_line: callback on_log_line(run, line) for each solver log line as it arrives
+        :param on_progress: callback on_progress(run, event) for each ProgressEvent parsed from the log
+        :param hooks: RunHooks objects, told about each phase and the end of the run
+        """
         self.name = flp.util.unique_name(name_prefix, trunc_uuid_len=6)
         self.solver_name = solver_name
         self.params = params if params is not None else {}
         self.term_status = None
-        self.log = '' # filled at completion
+        self.log = '' # latest log lines, filled while the solver runs
+        self.progress = None # latest ProgressEvent
+        self.progress_series = {field: array('d') for field in ProgressEvent._fields} # every ProgressEvent, by field. nan where not reported
         self.solve_duration = None # filled when __enter__ is triggered
+        self.timings = {} # seconds spent in each phase of the run, e.g. write_model, launch, solve, read_solution
+        self.file_sizes = {} # bytes in each file of the run, e.g. model_file, soln_file, log_file
+        self.cache_hit = False # True for a run returned from a SolveCache, rather than solved
+
+        self.hooks = list(hooks)
+        self.progress_parser = progress_parser
+        self.on_log_line = on_log_line
+        self.on_progress = on_progress
 
     def __enter__(self):
         self.log_filename = self.params.value_by_pyflip_name('output_log_file')
 
+        self.log = deque(maxlen=self.log_max_lines)
         self.log_fo = open(self.log_filename, 'w')
-        self.log_fo.write('PyFlip: Run started\n')
+        self.log_line('PyFlip: Run started')
         self.solve_duration = perf_counter()
         return self
 
     def __exit__(self, exc_type, exc_value, exc_traceback):
         self.solve_duration = self.get_duration()
-        self.log_fo.write('PyFlip: Run ended\n')
+        self.log_line('PyFlip: Run ended')
         self.log_fo.close()
+        self.log = list(self.log)
+        self.record_phase('solve', self.solve_duration)
+        self.record_file_size('log_file', self.log_filename)
+
+    def __getstate__(self):
+        # the log file and callbacks don't survive pickling (e.g. into a SolveCache)
+        state = self.__dict__.copy()
+        state.pop('log_fo', None)
+        state.update(progress_parser=None, on_log_line=None, on_progress=None, hooks=[])
+        return state
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Time a phase of the run, e.g. with run.phase('write_model'): ...
+        Durations of a repeated phase are added up
+        """
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.record_phase(name, perf_counter() - start)
+
+    def record_phase(self, name, duration):
+        self.timings[name] = self.timings.get(name, 0.0) + duration
+        for hook in self.hooks:
+            hook.phase_ended(self, name, duration)
+
+    def record_file_size(self, name, filename):
+        """
+        Record the size of one of the run's files, if it exists as a regular file (not e.g. a named pipe)
+        """
+        if os.path.isfile(filename):
+            self.file_sizes[name] = os.path.getsize(filename)
+
+    def finish(self):
+        """
+        Called by the solver once the run is complete, including reading the solution and deleting files
+        """
+        for hook in self.hooks:
+            hook.run_finished(self)
+
+    def log_line(self, line):
+        """
+        Record a line of solver output: write it to the log file, keep it in the log buffer,
+        and pass it (and any progress parsed from it) to the callbacks
+        """
+        line = line.rstrip('\r\n')
+        self.log_fo.write(f'{line}\n')
+        self.log.append(line)
+        if self.on_log_line is not None:
+            self.on_log_line(self, line)
+
+        if self.progress_parser is not None:
+            fields = self.progress_parser(line)
+            if fields:
+                self.update_progress(fields)
+
+    def update_progress(self, fields):
+        """
+        Merge newly reported progress fields into the latest ProgressEvent
+        """
+        previous = self.progress or ProgressEvent(None, None, None, None, None)
+        event = previous._replace(**fields)
+        if 'gap' not in fields and event.primal is not None and event.dual is not None:
+            event = event._replace(gap=abs(event.primal - event.dual) / max(abs(event.primal), 1e-10))
 
-        # we need to save the contents of the log.
-        # ideally there would be a split stream way to do this,
-        # however this is a workaround
-        with open(self.log_filename, 'r') as fo:
-            self.log = fo.read().splitlines()
+        self.progress = event
+        for field, value in zip(event._fields, event):
+            self.progress_series[field].append(nan if value is None else value)
 
-    # def write(self, msg):
-    #     self.log_fo.write(msg)
+        if self.on_progress is not None:
+            self.on_progress(self, event)
 
+    def progress_arrays(self):
+        """
+        Solve progress as columns, e.g. for plotting or a DataFrame
+        :return: dict of field name to numpy float array, with nan where a value wasn't reported
+        """
+        flp.util.require_module(np, 'numpy')
+        return {field: np.array(column) for field, column in self.progress_series.items()}
+
+    def write_progress_csv(self, filename, header=True):
+        """
+        Write the solve progress as CSV, one row per ProgressEvent, with the run name in the first column
+        so that files from many runs can be concatenated (write header=False after the first)
+        :param filename: filename, or any writable text file-like object
+        """
+        if not hasattr(filename, 'write'):
+            with open(filename, 'w', newline='') as fo:
+                return self.write_progress_csv(fo, header)
+
+        writer = csv.writer(filename)
+        if header:
+            writer.writerow(('run',) + ProgressEvent._fields)
+        for row in zip(*self.progress_series.values()):
+            writer.writerow([self.name] + ['' if isnan(value) else repr(value) for value in row])
 
     def get_duration(self):
         """
@@ -51,6 +173,21 @@ Status: {self.term_status}
 Parameters: {self.params}'''
 
 
+class RunHooks:
+    """
+    Base class for exporting run metrics, e.g. to a metrics system. Override either method,
+    and add an instance to solver.hooks
+    """
+    def phase_ended(self, run, phase, duration):
+        pass
+
+    def run_finished(self, run):
+        """
+        run.timings, run.file_sizes, run.term_status etc. are all complete at this point
+        """
+        pass
+
+
 class RunStatus(Enum):
     OPTIMAL = 'Optimal'
     INFEASIBLE = 'Infeasible'
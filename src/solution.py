@@ -1,3 +1,10 @@
+try:
+    import numpy as np
+except ImportError: # numpy is an optional dependency, only required for array-backed features
+    np = None
+
+import pyflip as flp
+
 class Solution:
     def __init__(self, var_dict=None):
         self.var_dict = var_dict if var_dict is not None else {}
@@ -12,4 +19,78 @@ class Solution:
             raise KeyError(f'This solution does not include the variable {var_name}')
 
     def __repr__(self):
-        return '\n'.join([f'{k}={v}' for k, v in self.var_dict.items()])
\ No newline at end of file
+        return '\n'.join([f'{k}={v}' for k, v in self.var_dict.items()])
+
+
+class ArraySolution(Solution):
+    """
+    Solution backed by a float64 array aligned with a model's variable order (model.variable_list).
+    The name index is the model's var_index, shared rather than copied, so each solution costs one array
+    and many can be kept in memory. values is the array itself, so changes through either are shared
+    """
+    def __init__(self, model, values=None):
+        """
+        :param values: array of variable values by index. Default is all zeros
+        """
+        flp.util.require_module(np, 'numpy')
+        self.model = model
+        self.index = model.var_index
+        if values is None:
+            self.values = np.zeros(len(model.variable_list))
+        else:
+            self.values = np.asarray(values, dtype=np.float64)
+            if self.values.shape != (len(model.variable_list),):
+                raise RuntimeError(f'Expected {len(model.variable_list)} values, got an array of shape {self.values.shape}')
+
+    @classmethod
+    def from_names_values(cls, model, names, values, default=0.0):
+        """
+        Build a solution in bulk, e.g. from parsed solver output
+        :param names: variable names
+        :param values: values (numbers or numeric strings) in the order of names
+        :param default: value of variables not in names
+        """
+        self = cls(model)
+        if default != 0.0:
+            self.values.fill(default)
+        index = self.index
+        indices = np.fromiter((index[name] for name in names), dtype=np.int64, count=len(names))
+        self.values[indices] = np.array(values, dtype=np.float64)
+        return self
+
+    @classmethod
+    def from_solution(cls, model, soln):
+        """
+        :param soln: Solution with a value for every model variable
+        """
+        var_dict = soln.var_dict
+        return cls(model, np.fromiter((var_dict[var.name] for var in model.variable_list), dtype=np.float64,
+                                      count=len(model.variable_list)))
+
+    @property
+    def var_dict(self):
+        """
+        Values by name, as for Solution. This is a new dict on each access, so set values with set_var
+        """
+        return dict(zip((var.name for var in self.model.variable_list), self.values.tolist()))
+
+    def set_var(self, var_name, val):
+        try:
+            self.values[self.index[var_name]] = val
+        except KeyError:
+            raise KeyError(f'The model of this solution does not include the variable {var_name}')
+
+    def get_val(self, var_name):
+        try:
+            return float(self.values[self.index[var_name]])
+        except KeyError:
+            raise KeyError(f'This solution does not include the variable {var_name}')
+
+    def to_solution(self):
+        """
+        :return: the equivalent dict-backed Solution
+        """
+        return Solution(self.var_dict)
+
+    def copy(self):
+        return ArraySolution(self.model, self.values.copy())
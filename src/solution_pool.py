@@ -0,0 +1,185 @@
+from hashlib import blake2b
+import heapq
+
+try:
+    import numpy as np
+except ImportError: # numpy is an optional dependency, only required for array-backed features
+    np = None
+
+import pyflip as flp
+
+
+class SolutionPool:
+    """
+    Compact store of many solutions to one model, e.g. the candidates of a heuristic.
+    Binary variables are kept bit-packed and the others as float64, so a solution of n binaries takes n/8 bytes
+    plus 8 per other variable. Duplicate solutions are dropped, and with a capacity only the best solutions
+    by objective value are kept. Solutions are returned as ArraySolution, so the best can be passed as a mipstart
+    """
+    def __init__(self, model, capacity=None):
+        """
+        :param capacity: maximum number of solutions. When full, adding a better solution evicts the worst.
+            Default is unlimited
+        """
+        flp.util.require_module(np, 'numpy')
+        self.model = model
+        self.capacity = capacity
+        self.n_vars = len(model.variable_list)
+
+        is_binary = np.array([not var.continuous and var.lower_bound == 0 and var.upper_bound == 1
+                              for var in model.variable_list], dtype=bool)
+        self.binary_indices = np.flatnonzero(is_binary)
+        self.other_indices = np.flatnonzero(~is_binary)
+
+        self.objective_coefs = np.zeros(self.n_vars)
+        for name, coef in model.objective.expr.var_dict.items():
+            self.objective_coefs[model.var_index[name]] += coef
+        self.objective_constant = model.objective.expr.constant
+        self.maximise = model.objective.dir == 'max'
+
+        n_slots = capacity if capacity is not None else 16
+        self.bits = np.zeros((n_slots, (len(self.binary_indices) + 7) // 8), dtype=np.uint8)
+        self.floats = np.zeros((n_slots, len(self.other_indices)))
+        self.objectives = np.zeros(n_slots)
+        self.active = np.zeros(n_slots, dtype=bool)
+        self._keys = [None] * n_slots # hash of each slot's solution
+        self._slot_of_key = {}
+        self._free_slots = list(range(n_slots - 1, -1, -1))
+        self._worst = [] # heap of (badness, slot). Entries of evicted slots are skipped when popped
+
+    def __len__(self):
+        return len(self._slot_of_key)
+
+    def _badness(self, objective):
+        return objective if self.maximise else -objective
+
+    def _pack(self, soln):
+        if isinstance(soln, flp.ArraySolution) and soln.index is self.model.var_index:
+            x = soln.values[:self.n_vars]
+        elif isinstance(soln, flp.Solution):
+            x = flp.ArraySolution.from_solution(self.model, soln).values
+        else:
+            x = np.asarray(soln, dtype=np.float64)
+        return np.packbits(x[self.binary_indices] > 0.5), x[self.other_indices], x
+
+    def _grow(self):
+        n_slots = len(self.active)
+        self.bits = np.concatenate((self.bits, np.zeros_like(self.bits)))
+        self.floats = np.concatenate((self.floats, np.zeros_like(self.floats)))
+        self.objectives = np.concatenate((self.objectives, np.zeros(n_slots)))
+        self.active = np.concatenate((self.active, np.zeros(n_slots, dtype=bool)))
+        self._keys.extend([None] * n_slots)
+        self._free_slots.extend(range(2 * n_slots - 1, n_slots - 1, -1))
+
+    def add(self, soln, objective=None):
+        """
+        :param soln: Solution, ArraySolution or array of values by variable index
+        :param objective: objective value, if already known. Default is to evaluate the model objective
+        :return: True if added, False if a duplicate or not good enough to keep
+        """
+        bits, floats, x = self._pack(soln)
+        key = blake2b(bits.tobytes() + floats.tobytes(), digest_size=16).digest()
+        if key in self._slot_of_key:
+            return False
+
+        if objective is None:
+            objective = float(x @ self.objective_coefs) + self.objective_constant
+
+        if not self._free_slots:
+            if self.capacity is None:
+                self._grow()
+            else:
+                worst_slot = self._pop_worst()
+                if self._badness(objective) <= self._badness(self.objectives[worst_slot]):
+                    heapq.heappush(self._worst, (self._badness(self.objectives[worst_slot]), worst_slot))
+                    return False
+                self._remove(worst_slot)
+
+        slot = self._free_slots.pop()
+        self.bits[slot] = bits
+        self.floats[slot] = floats
+        self.objectives[slot] = objective
+        self.active[slot] = True
+        self._keys[slot] = key
+        self._slot_of_key[key] = slot
+        heapq.heappush(self._worst, (self._badness(objective), slot))
+        return True
+
+    def _pop_worst(self):
+        while True:
+            badness, slot = heapq.heappop(self._worst)
+            if self.active[slot] and badness == self._badness(self.objectives[slot]):
+                return slot
+
+    def _remove(self, slot):
+        self.active[slot] = False
+        del self._slot_of_key[self._keys[slot]]
+        self._keys[slot] = None
+        self._free_slots.append(slot)
+
+    def __contains__(self, soln):
+        bits, floats, x = self._pack(soln)
+        return blake2b(bits.tobytes() + floats.tobytes(), digest_size=16).digest() in self._slot_of_key
+
+    def slots(self):
+        """
+        :return: indices of the stored solutions, best first. Distance queries return values in this order
+        """
+        slots = np.flatnonzero(self.active)
+        order = np.argsort(-self.objectives[slots] if self.maximise else self.objectives[slots], kind='stable')
+        return slots[order]
+
+    def values(self, slots=None):
+        """
+        :return: 2-D array of stored solutions, one row per slot (default all, best first), with values by variable index
+        """
+        slots = self.slots() if slots is None else np.asarray(slots)
+        x = np.zeros((len(slots), self.n_vars))
+        x[:, self.binary_indices] = np.unpackbits(self.bits[slots], axis=1, count=len(self.binary_indices))
+        x[:, self.other_indices] = self.floats[slots]
+        return x
+
+    def solution(self, slot):
+        return flp.ArraySolution(self.model, self.values([slot])[0])
+
+    def best(self, k=1):
+        """
+        :return: best solution, or list of the best k solutions
+        """
+        slots = self.slots()[:k]
+        solns = [flp.ArraySolution(self.model, x) for x in self.values(slots)]
+        return solns if k != 1 else (solns[0] if solns else None)
+
+    def hamming(self, soln):
+        """
+        :return: number of binary variables differing from soln, for each stored solution (best first)
+        """
+        bits, floats, x = self._pack(soln)
+        return _popcount(self.bits[self.slots()] ^ bits).sum(axis=1, dtype=np.int64)
+
+    def l1(self, soln):
+        """
+        :return: L1 distance from soln over all variables, for each stored solution (best first)
+        """
+        bits, floats, x = self._pack(soln)
+        slots = self.slots()
+        return _popcount(self.bits[slots] ^ bits).sum(axis=1, dtype=np.int64) + np.abs(self.floats[slots] - floats).sum(axis=1)
+
+    def diversity(self):
+        """
+        :return: mean Hamming distance between pairs of stored solutions, counted per binary variable
+            from how many solutions have it set, so without comparing every pair
+        """
+        n = len(self)
+        if n < 2:
+            return 0.0
+        ones = np.unpackbits(self.bits[self.active], axis=1, count=len(self.binary_indices)).sum(axis=0, dtype=np.int64)
+        return float((ones * (n - ones)).sum()) / (n * (n - 1) / 2)
+
+
+def _popcount(arr):
+    if hasattr(np, 'bitwise_count'): # numpy >= 2.0
+        return np.bitwise_count(arr)
+    return _POPCOUNT_TABLE[arr]
+
+_POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8) if np is not None else None
@@ -0,0 +1,137 @@
+from hashlib import blake2b
+import os
+import pickle
+import tempfile
+
+import pyflip as flp
+
+
+class SolveCache:
+    """
+    On-disk store of solve results, keyed by a hash of the model content and the run parameters,
+    so that solving the same model again with the same solver settings returns the stored Solution and Run
+    without writing the model or starting the solver. Opt in with solver.cache = flp.SolveCache('cache_dir').
+    Entries are one pickle file each; when the directory grows past max_bytes, the least recently used are removed.
+    The directory may be shared between processes
+    """
+    # per-run parameters, which differ between runs of the same model and don't affect the result
+    run_file_params = ('output_model_file', 'output_lp_file', 'output_log_file', 'output_soln_file', 'mipstart')
+    suffix = '.pkl'
+
+    def __init__(self, directory, max_bytes=1 << 30):
+        """
+        :param max_bytes: total size of the stored entries above which the least recently used are evicted
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, solver, model, run_params):
+        """
+        :param run_params: the run's ParameterSet
+        :return: hex string
+        """
+        h = blake2b(digest_size=16)
+        h.update(f'{solver.name}|{model.fingerprint()}'.encode())
+        for param in run_params.values():
+            if param.pyflip_name not in self.run_file_params:
+                h.update(f'|{param.solver_name}={param.value!r}'.encode())
+        return h.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + self.suffix)
+
+    def get(self, key):
+        """
+        :return: Solution, Run stored under key, or None
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as fo:
+                soln, run = pickle.load(fo)
+            os.utime(path) # the modified time marks the last use, for eviction
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError): # e.g. partly written, or from an incompatible version
+            self.misses += 1
+            self._remove(path)
+            return None
+
+        self.hits += 1
+        return soln, run
+
+    def put(self, key, soln, run):
+        """
+        Store a result under key, then evict entries if over max_bytes
+        """
+        if isinstance(soln, flp.ArraySolution): # don't pickle the model along with it
+            soln = soln.to_solution()
+
+        # write to a temporary file and rename, so that readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=self.directory)
+        try:
+            with os.fdopen(fd, 'wb') as fo:
+                pickle.dump((soln, run), fo, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            self._remove(tmp_path)
+            raise
+
+        self.evict()
+
+    def entries(self):
+        """
+        :return: list of (last used time, size in bytes, path), least recently used first
+        """
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith(self.suffix):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError: # removed by another process
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        entries.sort()
+        return entries
+
+    def size(self):
+        """
+        :return: total bytes stored
+        """
+        return sum(size for mtime, size, path in self.entries())
+
+    def evict(self, max_bytes=None):
+        """
+        Remove the least recently used entries until the total size is at most max_bytes (default self.max_bytes)
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        entries = self.entries()
+        total = sum(size for mtime, size, path in entries)
+        for mtime, size, path in entries:
+            if total <= max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    def clear(self):
+        self.evict(0)
+
+    def __len__(self):
+        return len(self.entries())
+
+    def __contains__(self, key):
+        return os.path.isfile(self._path(key))
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def __repr__(self):
+        return f'SolveCache at {self.directory}: {len(self)} entries, {self.hits} hits, {self.misses} misses'
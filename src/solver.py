@@ -1,14 +1,33 @@
 import subprocess
 import os
+import re
+import io
+import threading
+import tempfile
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from abc import ABC, abstractmethod
 from shutil import which
-from itertools import count
 from collections import OrderedDict
 from copy import deepcopy
 from platform import system
+from time import perf_counter
+
+try:
+    import numpy as np
+    import scipy.optimize
+    import scipy.sparse
+except ImportError: # scipy is an optional dependency, only required for the in-process HiGHS solver
+    np = scipy = None
 
 import pyflip as flp
 
+# progress lines in solver logs
+_CBC_NODE_RE = re.compile(r'Cbc0010I After (\d+) nodes, \d+ on tree, (\S+) best solution, best possible (\S+) \(([\d.]+) seconds\)')
+_CBC_SOLUTION_RE = re.compile(r'Cbc00(?:04|12)I Integer solution of (\S+) found .*?(\d+) nodes \(([\d.]+) seconds\)')
+_CBC_COMPLETED_RE = re.compile(r'Cbc0001I Search completed - best objective (\S+), took \d+ iterations and (\d+) nodes \(([\d.]+) seconds\)')
+_GUROBI_NODE_RE = re.compile(r'[ H*]\s*(\d+)\s+\d+\s.*?(-?\d[\d.e+-]*|-)\s+(-?\d[\d.e+-]*)\s+([\d.]+%|-)\s+\S+\s+(\d+)s$')
+
 
 class Solver(ABC):
     """
@@ -48,14 +67,41 @@ class IPSolver(Solver, ABC):
 
 
 class IPSolverCL(IPSolver, ABC):
-    def __init__(self, pyflip_params=None, solver_params=None, path_to_solver=None):
+    model_formats = ('lp', 'mps', 'mps.gz')
+    io_modes = ('file', 'fifo')
+    fifo_model_formats = ('lp',) # MPS readers may seek or probe the file, which a FIFO doesn't allow
+    run_in_shell = False
+
+    def __init__(self, pyflip_params=None, solver_params=None, path_to_solver=None, model_format='lp', io_mode='file'):
         """
         :param pyflip_params: Dictionary of allowable params
         :param solver_params: Dictionary of solver-specific params
         :param path_to_solver: Specify path to solver executable
+        :param model_format: Format of the model file passed to the solver: 'lp', 'mps' or 'mps.gz'
+        :param io_mode: 'file' to write the model file before launching the solver, and read the solution file after.
+            'fifo' to stream the model to the solver and read back the solution through named pipes, so that nothing
+            is written to disk and model writing overlaps with solver startup (not available on Windows)
         """
         super().__init__(pyflip_params or {}, solver_params or {})
         self.path_to_solver = self.find_cl_executable(path_to_solver)
+        if model_format not in self.model_formats:
+            raise RuntimeError(f'Model format must be one of {self.model_formats}')
+        if io_mode not in self.io_modes:
+            raise RuntimeError(f'IO mode must be one of {self.io_modes}')
+        if io_mode == 'fifo':
+            if not hasattr(os, 'mkfifo'):
+                raise RuntimeError('IO mode fifo requires named pipe support (os.mkfifo), which this platform lacks')
+            if model_format not in self.fifo_model_formats:
+                raise RuntimeError(f'IO mode fifo requires a model format in {self.fifo_model_formats}')
+        self.model_format = model_format
+        self.io_mode = io_mode
+
+        # callbacks on_log_line(run, line) and on_progress(run, event), called as the solver log streams in
+        self.on_log_line = None
+        self.on_progress = None
+        self.hooks = [] # RunHooks objects, e.g. for exporting run timings to a metrics system
+        self.array_solutions = False # return solutions as ArraySolution (requires numpy)
+        self.cache = None # optional SolveCache, checked by solve before writing the model
 
 
     def find_cl_executable(self, path_to_solver):
@@ -88,17 +134,346 @@ class IPSolverCL(IPSolver, ABC):
     def solver_binary(self):
         pass
 
-    def generate_run_params(self, run_name, run_pyflip_params, run_solver_params):
+    def write_model_file(self, model, filename):
+        """
+        Write the model file in the selected model format
+        :param filename: path of the model file, usually the run's output_model_file
+        :return: filename
+        """
+        if self.model_format == 'lp':
+            return flp.write_lp_file(model, filename)
+        else:
+            return flp.write_mps_file(model, filename)
+
+    def write_run_model_file(self, run, model):
+        """
+        Write the run's model file, recording the time taken and file size on the run
+        """
+        filename = run.params.value_by_pyflip_name('output_model_file')
+        with run.phase('write_model'):
+            self.write_model_file(model, filename)
+        run.record_file_size('model_file', filename)
+
+    def read_run_output_files(self, run, model, soln_fo=None):
+        """
+        Read the run's solution, recording the time taken and file size on the run
+        :return: Solution
+        """
+        if soln_fo is None:
+            run.record_file_size('soln_file', run.params.value_by_pyflip_name('output_soln_file'))
+        with run.phase('read_solution'):
+            return self.read_output_files(run, model, soln_fo)
+
+    def generate_run_params(self, run_name, run_pyflip_params, run_solver_params, directory='.'):
         run_params = deepcopy(self.params)
         if run_pyflip_params is not None:
             run_params.set_pyflip_params(run_pyflip_params)
         if run_solver_params is not None:
             run_params.set_solver_params(run_solver_params)
-        run_params.set_pyflip_params({'output_lp_file': f'{run_name}.lp'}, auto_include=False)
-        run_params.set_pyflip_params({'output_log_file': f'{run_name}.log'}, auto_include=False)
-        run_params.set_pyflip_params({'output_soln_file': f'{run_name}.sol'})
+        run_path = os.path.join(directory, run_name) if directory != '.' else run_name
+        run_params.set_pyflip_params({'output_model_file': f'{run_path}.{self.model_format}'}, auto_include=False)
+        run_params.set_pyflip_params({'output_lp_file': f'{run_path}.{self.model_format}'}, auto_include=False) # previous name, kept for compatibility
+        run_params.set_pyflip_params({'output_log_file': f'{run_path}.log'}, auto_include=False)
+        run_params.set_pyflip_params({'output_soln_file': f'{run_path}.sol'})
         return run_params
 
+    @abstractmethod
+    def build_args(self, run):
+        """
+        :return: list of solver executable and arguments for this run
+        """
+        pass
+
+    def build_cmd(self, run):
+        """
+        :return: solver command line for this run
+        """
+        return ' '.join(self.build_args(run))
+
+    @abstractmethod
+    def read_output_files(self, run, model, soln_fo=None):
+        """
+        Read the solution and termination status
+        :param soln_fo: readable solution file object. Default is to open the run's solution file
+        :return: Solution
+        """
+        pass
+
+    def parse_progress_line(self, line):
+        """
+        :return: dict of ProgressEvent fields (as reported by the solver) found in a log line, or None
+        """
+        return None
+
+    def run_solver(self, run):
+        args = self.build_args(run)
+        cmd = ' '.join(args)
+        run.params.set_pyflip_params({'cmd': cmd}, auto_include=False)
+
+        with run:
+            with run.phase('launch'):
+                proc = subprocess.Popen(cmd if self.run_in_shell else args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                        shell=self.run_in_shell, text=True, errors='replace')
+            with proc:
+                for line in proc.stdout:
+                    run.log_line(line)
+
+    async def run_solver_async(self, run, timeout=None):
+        """
+        Run the solver as an asyncio subprocess, streaming its output into the run log.
+        The solver process is killed if the timeout expires or the calling task is cancelled
+        :param timeout: seconds before the solver process is killed
+        :return: True if the solver was killed on timeout
+        """
+        args = self.build_args(run)
+        run.params.set_pyflip_params({'cmd': ' '.join(args)}, auto_include=False)
+
+        with run:
+            with run.phase('launch'):
+                proc = await asyncio.create_subprocess_exec(*args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT)
+            try:
+                await asyncio.wait_for(_stream_log(proc, run), timeout)
+            except asyncio.TimeoutError:
+                return True
+            finally:
+                if proc.returncode is None:
+                    proc.kill()
+                    await proc.wait()
+
+        return False
+
+    def prepare_run(self, model, mipstart=None, run_pyflip_params=None, run_solver_params=None, directory='.'):
+        """
+        Create the Run object and its parameters (and write any mipstart file)
+        :param directory: directory for the run's files
+        :return: Run
+        """
+        # Create solver run object
+        run = flp.Run(name_prefix=model.name.replace(" ", "_"), solver_name=self.name, progress_parser=self.parse_progress_line,
+                      on_log_line=self.on_log_line, on_progress=self.on_progress, hooks=self.hooks)
+
+        if (mipstart is not None):
+            with run.phase('write_mipstart'):
+                mipstart_filename = self.write_mipstart_soln(run, mipstart, directory)
+            run.record_file_size('mipstart_file', mipstart_filename)
+            run_pyflip_params = dict(run_pyflip_params or {})
+            run_pyflip_params['mipstart'] = mipstart_filename
+
+        # Define run parameters, extended from solver parameters
+        run.params = self.generate_run_params(run.name, run_pyflip_params, run_solver_params, directory)
+        return run
+
+    def solve(self, model, mipstart=None, keep_log_file=False, keep_lp_file=False, keep_sol_file=False, log_filename=None,
+              run_pyflip_params=None, run_solver_params=None, directory='.'):
+        """
+        :param keep_lp_file: keep the model file (LP or MPS). No effect in fifo IO mode
+        :param keep_sol_file: keep the solution file. No effect in fifo IO mode
+        :param directory: directory for the run's files
+        :return: Solution, Run. With a cache set, a stored result for the same model and parameters is returned
+            without solving, marked by run.cache_hit
+        """
+        run = self.prepare_run(model, mipstart, run_pyflip_params, run_solver_params, directory)
+
+        cache_key = None
+        if self.cache is not None and mipstart is None: # a mipstart may change the solution returned, so isn't cached
+            cache_key = self.cache.key(self, model, run.params)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return self.cached_result(model, *cached)
+
+        if self.io_mode == 'fifo':
+            soln = self.solve_through_fifos(run, model)
+        else:
+            # Generate model file (LP or MPS), run solver, then read solution file and logfile (solver-specific)
+            self.write_run_model_file(run, model)
+            self.run_solver(run)
+            soln = self.read_run_output_files(run, model)
+
+        # delete files
+        with run.phase('delete_files'):
+            self.delete_files(run.params, keep_log_file, keep_lp_file, keep_sol_file)
+
+        if cache_key is not None and run.term_status not in (None, flp.RunStatus.UNKNOWN):
+            self.cache.put(cache_key, soln, run)
+
+        run.finish()
+        return soln, run
+
+    def cached_result(self, model, soln, run):
+        """
+        :return: Solution, Run from the cache, with the solution in the form this solver returns
+        """
+        run.cache_hit = True
+        if self.array_solutions:
+            soln = flp.ArraySolution.from_solution(model, soln)
+        return soln, run
+
+    async def solve_async(self, model, mipstart=None, keep_log_file=False, keep_lp_file=False, keep_sol_file=False,
+                          run_pyflip_params=None, run_solver_params=None, timeout=None, directory='.'):
+        """
+        Solve without blocking the asyncio event loop. Model writing and solution reading run on the loop's
+        default executor, and the solver output is streamed into the run log while it runs. Always uses model files,
+        whatever the IO mode.
+        Cancelling the task kills the solver process and removes the run's files
+        :param timeout: seconds before the solver process is killed, giving run status TIMELIMIT and an empty Solution.
+            Unlike the time_limit parameter, this doesn't rely on the solver stopping itself
+        :return: Solution, Run
+        """
+        run = self.prepare_run(model, mipstart, run_pyflip_params, run_solver_params, directory)
+        loop = asyncio.get_running_loop()
+
+        try:
+            await loop.run_in_executor(None, self.write_run_model_file, run, model)
+            if await self.run_solver_async(run, timeout):
+                run.term_status = flp.RunStatus.TIMELIMIT
+                soln = flp.Solution()
+            else:
+                soln = await loop.run_in_executor(None, self.read_run_output_files, run, model)
+        finally:
+            with run.phase('delete_files'):
+                self.delete_files(run.params, keep_log_file, keep_lp_file, keep_sol_file)
+
+        run.finish()
+        return soln, run
+
+    def solve_sequence(self, models, keep_log_file=False, keep_lp_file=False, keep_sol_file=False,
+                       run_pyflip_params=None, run_solver_params=None):
+        """
+        Solve models one after another, writing the next model file on a background thread while the solver
+        works on the current one. (In fifo IO mode each model is already written while its own solve starts,
+        so models are simply solved in turn)
+        :param models: iterable of Model objects
+        :return: generator of (Solution, Run), in the order of models
+        """
+        if self.io_mode == 'fifo':
+            for model in models:
+                yield self.solve(model, None, keep_log_file, keep_lp_file, keep_sol_file, None,
+                                 run_pyflip_params, run_solver_params)
+            return
+
+        def finish(model, run, written):
+            written.result() # wait for the model file, re-raising any write error
+            self.run_solver(run)
+            soln = self.read_run_output_files(run, model)
+            with run.phase('delete_files'):
+                self.delete_files(run.params, keep_log_file, keep_lp_file, keep_sol_file)
+            run.finish()
+            return soln, run
+
+        with ThreadPoolExecutor(max_workers=1) as writer:
+            pending = None
+            try:
+                for model in models:
+                    run = self.prepare_run(model, None, run_pyflip_params, run_solver_params)
+                    written = writer.submit(self.write_run_model_file, run, model)
+                    previous, pending = pending, (model, run, written)
+                    if previous is not None:
+                        yield finish(*previous)
+
+                previous, pending = pending, None
+                if previous is not None:
+                    yield finish(*previous)
+
+            finally:
+                if pending is not None: # stopped early, so remove the model file written ahead
+                    pending[2].exception()
+                    self.delete_files(pending[1].params, True, False, True)
+
+    def solve_many(self, models, max_workers=None, total_threads=None, ordered=False, keep_log_file=False,
+                   keep_lp_file=False, keep_sol_file=False, run_pyflip_params=None, run_solver_params=None):
+        """
+        Solve models concurrently, with up to max_workers solver processes running at once.
+        Each worker keeps its files in its own temporary directory, so runs never collide on disk
+        :param max_workers: number of concurrent solves. Default is the number of CPUs
+        :param total_threads: thread budget shared by all concurrent solves. Each run gets
+            total_threads // max_workers threads (at least 1). Default leaves the solver's own threads setting
+        :param ordered: yield results in the order of models, rather than as they complete
+        :return: generator of (Solution, Run)
+        """
+        models = list(models)
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        max_workers = max(1, min(max_workers, len(models) or 1))
+
+        if total_threads is not None:
+            run_pyflip_params = dict(run_pyflip_params or {})
+            run_pyflip_params['threads'] = max(1, total_threads // max_workers)
+
+        worker = threading.local()
+        worker_dirs = []
+        def solve_in_worker_dir(model):
+            if not hasattr(worker, 'directory'):
+                worker.directory = tempfile.mkdtemp(prefix='pyflip_')
+                worker_dirs.append(worker.directory)
+            return self.solve(model, None, keep_log_file, keep_lp_file, keep_sol_file, None,
+                              run_pyflip_params, run_solver_params, worker.directory)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = [pool.submit(solve_in_worker_dir, model) for model in models]
+            try:
+                for future in (futures if ordered else as_completed(futures)):
+                    yield future.result()
+            finally:
+                for future in futures: # stopped early (or a solve failed), so don't start any more solves
+                    future.cancel()
+
+        for directory in worker_dirs:
+            try:
+                os.rmdir(directory) # only removed if empty, i.e. no files were kept
+            except OSError:
+                pass
+
+    def solve_through_fifos(self, run, model):
+        """
+        Run the solver with named pipes in place of the model and solution files.
+        The model is written and the solution read by background threads while the solver runs
+        :return: Solution
+        """
+        model_filename = run.params.value_by_pyflip_name('output_model_file')
+        soln_filename = run.params.value_by_pyflip_name('output_soln_file')
+        os.mkfifo(model_filename)
+        os.mkfifo(soln_filename)
+
+        errors = []
+        soln_chunks = []
+        threads = []
+        parent_fds = []
+        soln_fo = None
+        try:
+            # We hold both ends of each pipe for the whole solve, so that no thread or solver blocks on opening a pipe,
+            # and a solver which opens the model file more than once (as CBC does) always finds the stream.
+            # The read ends must be opened first, non-blocking. As the model pipe never reaches end of file while
+            # we hold it, solvers rely on the LP end keyword instead
+            parent_fds.append(os.open(model_filename, os.O_RDONLY | os.O_NONBLOCK))
+            parent_fds.append(os.open(model_filename, os.O_WRONLY))
+            soln_fo = open(os.open(soln_filename, os.O_RDONLY | os.O_NONBLOCK), 'r')
+            parent_fds.append(os.open(soln_filename, os.O_WRONLY))
+            os.set_blocking(soln_fo.fileno(), True)
+
+            threads.append(threading.Thread(target=_read_fifo, args=(soln_fo, soln_chunks), daemon=True))
+            threads.append(threading.Thread(target=_write_fifo, args=(self.write_run_model_file, run, model, errors), daemon=True))
+            for thread in threads:
+                thread.start()
+
+            self.run_solver(run)
+
+        finally:
+            # Closing our ends releases both threads: the writer with a broken pipe if the solver stopped reading,
+            # and the reader with end of file once the solver has closed the solution file (or never opened it)
+            for fd in parent_fds:
+                os.close(fd)
+            for thread in threads:
+                thread.join()
+            if soln_fo is not None:
+                soln_fo.close()
+            for filename in (model_filename, soln_filename):
+                os.remove(filename)
+
+        if errors:
+            raise errors[0]
+
+        return self.read_run_output_files(run, model, io.StringIO(''.join(soln_chunks)))
+
     def delete_files(self, run_params, keep_log_file, keep_lp_file, keep_sol_file):
         if not keep_log_file:
             try:
@@ -107,7 +482,7 @@ class IPSolverCL(IPSolver, ABC):
                 pass
         if not keep_lp_file:
             try:
-                os.remove(run_params.value_by_pyflip_name('output_lp_file'))
+                os.remove(run_params.value_by_pyflip_name('output_model_file'))
             except FileNotFoundError:
                 pass
         if not keep_sol_file:
@@ -118,8 +493,8 @@ class IPSolverCL(IPSolver, ABC):
 
 
 class GurobiCL(IPSolverCL):
-    def __init__(self, pyflip_params=None, solver_params=None, path_to_solver=None):
-        super().__init__(pyflip_params, solver_params, path_to_solver)
+    def __init__(self, pyflip_params=None, solver_params=None, path_to_solver=None, model_format='lp', io_mode='file'):
+        super().__init__(pyflip_params, solver_params, path_to_solver, model_format, io_mode)
 
     @property
     def solver_binary(self):
@@ -133,6 +508,7 @@ class GurobiCL(IPSolverCL):
         # http://www.gurobi.com/documentation/8.0/refman/params.html
         return OrderedDict((
             ('time_limit', 'TimeLimit'),
+            ('threads', 'Threads'),
             ('output_soln_file', 'ResultFile'),
             ('mipstart', 'InputFile')
         ))
@@ -148,7 +524,16 @@ class GurobiCL(IPSolverCL):
             'Infeasible or unbounded model': flp.RunStatus.INFEASIBLE_OR_UNBOUNDED,
         }
 
-    def write_mipstart_soln(self, run, soln):
+    def parse_progress_line(self, line):
+        # node log line: Expl Unexpl | Obj Depth IntInf | Incumbent BestBd Gap | It/Node Time
+        match = _GUROBI_NODE_RE.match(line)
+        if match is None:
+            return None
+        nodes, primal, dual, gap, time = match.groups()
+        return {'time': float(time), 'primal': _solver_float(primal), 'dual': _solver_float(dual),
+                'gap': None if gap == '-' else float(gap[:-1]) / 100, 'nodes': int(nodes)}
+
+    def write_mipstart_soln(self, run, soln, directory='.'):
         """
         Write mipstart solution file as part of a run
         http://www.gurobi.com/documentation/8.0/refman/mst_format.html
@@ -156,22 +541,33 @@ class GurobiCL(IPSolverCL):
         if not isinstance(soln, flp.Solution):
             raise RuntimeError('MipStart must be Solution object')
 
-        filename = f'{run.name}.mst'
+        filename = os.path.join(directory, f'{run.name}.mst')
         with open(filename, 'w') as fo:
-            for var_name, val in soln.var_dict.items():
-                fo.write(f'{var_name} {val}\n')
+            fo.write(''.join(f'{var_name} {val}\n' for var_name, val in soln.var_dict.items()))
 
         return filename
 
-    def read_output_files(self, run, model):
-        soln = flp.Solution()
-        try:
-            with open(run.params.value_by_pyflip_name('output_soln_file'), 'r') as fo:
-                for line in fo:
-                    split_line = line.split()
-                    if split_line[0] != '#':
-                        soln.set_var(*split_line)
-        except FileNotFoundError:
+    def read_output_files(self, run, model, soln_fo=None):
+        if soln_fo is None:
+            try:
+                with open(run.params.value_by_pyflip_name('output_soln_file'), 'r') as fo:
+                    return self.read_output_files(run, model, fo)
+            except FileNotFoundError:
+                soln_fo = io.StringIO()
+
+        names, values = [], []
+        for line in soln_fo:
+            split_line = line.split()
+            if split_line[0] != '#':
+                names.append(split_line[0])
+                values.append(split_line[1])
+
+        if self.array_solutions:
+            soln = flp.ArraySolution.from_names_values(model, names, values)
+        else:
+            soln = flp.Solution(dict(zip(names, map(float, values))))
+
+        if not names:
             print('No solution file generated by solver - see run log for details')
 
         # search in log output for termination status
@@ -186,50 +582,22 @@ class GurobiCL(IPSolverCL):
 
         return soln
 
-    def solve(self, model, mipstart=None, keep_log_file=False, keep_lp_file=False, keep_sol_file=False, log_filename=None,
-              run_pyflip_params=None, run_solver_params=None):
-        # Create solver run object
-        run = flp.Run(name_prefix=model.name.replace(" ", "_"), solver_name=self.name)
-
-        if (mipstart is not None):
-            mipstart_filename = self.write_mipstart_soln(run, mipstart)
-            run_pyflip_params = run_pyflip_params or {}
-            run_pyflip_params['mipstart'] = mipstart_filename
-
-        # Generate LP file
-        flp.write_lp_file(model, f'{run.name}.lp')
-
-        # Define run parameters, extended from solver parameters
-        run.params = self.generate_run_params(run.name, run_pyflip_params, run_solver_params)
-
-        # Build command (solver-specific CLI)
+    def build_args(self, run):
         args = [self.path_to_solver]
         for param in run.params.values():
             if param.auto_include:
                 # if param.value != '': #(key,value) parameter
                 args.append(f'{param.solver_name}={param.value}')
 
-        args.append(run.params.value_by_pyflip_name('output_lp_file'))
-        cmd = ' '.join(args)
-        run.params.set_pyflip_params({'cmd': cmd}, auto_include=False)
-
-        # Run solver
-        with run:
-            run.log_fo.flush()
-            subprocess.run(cmd, stdout=run.log_fo, stderr=run.log_fo)
-
-        # Read solution file and logfile (solver-specific)
-        soln = self.read_output_files(run, model)
-
-        # delete files
-        self.delete_files(run.params, keep_log_file, keep_lp_file, keep_sol_file)
-
-        return soln, run
+        args.append(run.params.value_by_pyflip_name('output_model_file'))
+        return args
 
 
 class CbcCL(IPSolverCL):
-    def __init__(self, pyflip_params=None, solver_params=None, path_to_solver=None):
-        super().__init__(pyflip_params, solver_params, path_to_solver)
+    run_in_shell = True
+
+    def __init__(self, pyflip_params=None, solver_params=None, path_to_solver=None, model_format='lp', io_mode='file'):
+        super().__init__(pyflip_params, solver_params, path_to_solver, model_format, io_mode)
 
         # Set default parameters
         self.params.set_solver_params(OrderedDict((
@@ -249,6 +617,7 @@ class CbcCL(IPSolverCL):
         # https://projects.coin-or.org/CoinBinary/export/1059/OptimizationSuite/trunk/Installer/files/doc/cbcCommandLine.pdf
         return OrderedDict((
             ('time_limit', 'seconds'),
+            ('threads', 'threads'),
             ('output_soln_file', 'solution'),
             ('mipstart', 'mipstart')
         ))
@@ -263,7 +632,21 @@ class CbcCL(IPSolverCL):
             'Unbounded': flp.RunStatus.UNBOUNDED
         }
 
-    def write_mipstart_soln(self, run, soln):
+    def parse_progress_line(self, line):
+        # objective values are as CBC reports them, i.e. negated for maximisation problems
+        match = _CBC_NODE_RE.match(line)
+        if match is not None:
+            nodes, primal, dual, time = match.groups()
+            return {'time': float(time), 'primal': _solver_float(primal), 'dual': _solver_float(dual), 'nodes': int(nodes)}
+
+        match = _CBC_SOLUTION_RE.match(line) or _CBC_COMPLETED_RE.match(line)
+        if match is not None:
+            primal, nodes, time = match.groups()
+            return {'time': float(time), 'primal': _solver_float(primal), 'nodes': int(nodes)}
+
+        return None
+
+    def write_mipstart_soln(self, run, soln, directory='.'):
         """
         Write mipstart solution file as part of a run
         http://www.gurobi.com/documentation/8.0/refman/mst_format.html
@@ -271,78 +654,136 @@ class CbcCL(IPSolverCL):
         if not isinstance(soln, flp.Solution):
             raise RuntimeError('MipStart must be Solution object')
 
-        filename = f'{run.name}.mst'
+        filename = os.path.join(directory, f'{run.name}.mst')
         with open(filename, 'w') as fo:
-            ctr = count() # required for formatting
-            for var_name, val in soln.var_dict.items():
-                fo.write(f'{next(ctr)} {var_name} {val}\n')
+            # numbered lines are required for formatting
+            fo.write(''.join(f'{i} {var_name} {val}\n' for i, (var_name, val) in enumerate(soln.var_dict.items())))
 
         return filename
 
-    def read_output_files(self, run, model):
-        soln = flp.Solution()
-        with open(run.params.value_by_pyflip_name('output_soln_file'), 'r') as fo:
-            first_line = next(fo)
-
-            # get run status from solution file
-            status_str = first_line.split('-')[0].strip()
-            try:
-                run.term_status = self.term_status_mapping[status_str]
-            except KeyError:
-                print(f'Unrecognized termination status: "{status_str}"')
-                run.term_status = status_str
-
-            for line in fo:
-                split_line = line.split()
-                soln.set_var(split_line[1], split_line[2])
+    def read_output_files(self, run, model, soln_fo=None):
+        if soln_fo is None:
+            with open(run.params.value_by_pyflip_name('output_soln_file'), 'r') as fo:
+                return self.read_output_files(run, model, fo)
 
-        for var in model.variables.values():
-            if var.name not in soln.var_dict:
-                soln.set_var(var.name, 0.0)
+        first_line = next(soln_fo, '')
 
+        # get run status from solution file
+        status_str = first_line.split('-')[0].strip()
+        try:
+            run.term_status = self.term_status_mapping[status_str]
+        except KeyError:
+            print(f'Unrecognized termination status: "{status_str}"')
+            run.term_status = status_str
+
+        names, values = [], []
+        for line in soln_fo:
+            split_line = line.split()
+            names.append(split_line[1])
+            values.append(split_line[2])
+
+        # variables at zero may be left out of the solution file
+        if self.array_solutions:
+            return flp.ArraySolution.from_names_values(model, names, values)
+
+        soln = flp.Solution(dict.fromkeys(model.variables, 0.0))
+        soln.var_dict.update(zip(names, map(float, values)))
         return soln
 
-    def solve(self, model, mipstart=None, keep_log_file=False, keep_lp_file=False, keep_sol_file=False, log_filename=None,
-              run_pyflip_params=None, run_solver_params=None):
-        # Create solver run object
-        run = flp.Run(name_prefix=model.name.replace(" ", "_"), solver_name=self.name)
-
-        if (mipstart is not None):
-            mipstart_filename = self.write_mipstart_soln(run, mipstart)
-            run_pyflip_params = run_pyflip_params or {}
-            run_pyflip_params['mipstart'] = mipstart_filename
-
-        # Generate LP file
-        flp.write_lp_file(model, f'{run.name}.lp')
-
-        # Define run parameters, extended from solver parameters
-        run.params = self.generate_run_params(run.name, run_pyflip_params, run_solver_params)
-
-        # Build command (solver-specific CLI)
-        args = [self.path_to_solver, run.params.value_by_pyflip_name('output_lp_file')]
+    def build_args(self, run):
+        args = [self.path_to_solver, run.params.value_by_pyflip_name('output_model_file')]
         for param in run.params.values():
             if param.auto_include:
                 if param.value != '': #(key,value) parameter
                     if param.pyflip_name == 'output_soln_file':
                         args.append('solve')  # a hack required for CBC where the solve command must be before the solution file spec
-                    args.append(f'{param.solver_name} {param.value}')
+                    args.extend((f'{param.solver_name}', f'{param.value}'))
                 else: # key-only parameter
                     args.append(f'{param.solver_name}')
 
-        cmd = ' '.join(args)
-        run.params.set_pyflip_params({'cmd': cmd}, auto_include=False)
+        return args
 
-        # Run solver
-        with run:
-            run.log_fo.flush()
-            p = subprocess.run(cmd, stdout=run.log_fo, stderr=run.log_fo, shell=True)
 
-        # Read solution file and logfile (solver-specific)
-        soln = self.read_output_files(run, model)
+class ScipyHighs(IPSolver):
+    """
+    Solves in-process with the HiGHS solver bundled with SciPy (scipy.optimize.milp), with no solver executable
+    or files. The model is compiled to sparse arrays (see CompiledModel), so for small and medium models this avoids
+    the cost of writing an LP file and starting a process. Requires numpy and scipy
+    """
+    status_mapping = {
+        0: flp.RunStatus.OPTIMAL,
+        1: flp.RunStatus.TIMELIMIT, # or another iteration or node limit
+        2: flp.RunStatus.INFEASIBLE,
+        3: flp.RunStatus.UNBOUNDED,
+    }
+
+    def __init__(self, pyflip_params=None, solver_params=None):
+        """
+        :param solver_params: Dictionary of scipy.optimize.milp options, e.g. mip_rel_gap, node_limit, presolve
+        """
+        flp.util.require_module(scipy, 'scipy')
+        super().__init__(pyflip_params or {}, solver_params or {})
+        self.hooks = [] # RunHooks objects, e.g. for exporting run timings to a metrics system
+        self.array_solutions = False # return solutions as ArraySolution
 
-        # delete files
-        self.delete_files(run.params, keep_log_file, keep_lp_file, keep_sol_file)
+    @property
+    def param_mapping(self):
+        return OrderedDict((
+            ('time_limit', 'time_limit'),
+        ))
 
+    def solve(self, model, mipstart=None, run_pyflip_params=None, run_solver_params=None):
+        """
+        :param mipstart: ignored, as scipy.optimize.milp doesn't take a starting solution
+        :return: Solution, Run
+        """
+        run = flp.Run(name_prefix=model.name.replace(" ", "_"), solver_name=self.name, hooks=self.hooks)
+        run.params = deepcopy(self.params)
+        if run_pyflip_params is not None:
+            run.params.set_pyflip_params(run_pyflip_params)
+        if run_solver_params is not None:
+            run.params.set_solver_params(run_solver_params)
+
+        with run.phase('compile'):
+            compiled = flp.CompiledModel(model)
+            n_vars = len(compiled.var_names)
+            variables = model.variable_list
+            bounds = scipy.optimize.Bounds(np.fromiter((var.lower_bound for var in variables), dtype=np.float64, count=n_vars),
+                                           np.fromiter((var.upper_bound for var in variables), dtype=np.float64, count=n_vars))
+            integrality = np.fromiter((not var.continuous for var in variables), dtype=np.uint8, count=n_vars)
+            constraints = ()
+            if compiled.num_rows():
+                A = scipy.sparse.csr_array((compiled.data, compiled.indices, compiled.indptr), shape=(compiled.num_rows(), n_vars))
+                constraints = scipy.optimize.LinearConstraint(A, compiled.lower, compiled.upper)
+            sign = -1.0 if model.objective.dir == 'max' else 1.0
+
+        start = perf_counter()
+        result = scipy.optimize.milp(sign * compiled.objective_coefs, integrality=integrality, bounds=bounds,
+                                     constraints=constraints, options={param.solver_name: param.value for param in run.params.values()})
+        run.solve_duration = perf_counter() - start
+        run.record_phase('solve', run.solve_duration)
+        run.term_status = self.status_mapping.get(result.status, flp.RunStatus.UNKNOWN)
+        run.log = [result.message]
+
+        with run.phase('read_solution'):
+            if result.x is None:
+                soln = flp.Solution()
+            elif self.array_solutions:
+                soln = flp.ArraySolution(model, result.x)
+            else:
+                soln = flp.Solution(dict(zip(compiled.var_names, result.x.tolist())))
+
+        if result.x is not None:
+            dual = getattr(result, 'mip_dual_bound', None) # only reported for models with integer variables
+            run.update_progress({
+                'time': run.solve_duration,
+                'primal': sign * result.fun + compiled.objective_constant,
+                'dual': sign * dual + compiled.objective_constant if dual is not None else None,
+                'gap': getattr(result, 'mip_gap', None),
+                'nodes': getattr(result, 'mip_node_count', None),
+            })
+
+        run.finish()
         return soln, run
 
 
@@ -350,6 +791,35 @@ class Cplex(IPSolver):
     def solve(self, model):
         pass
 
+
+def _write_fifo(write_run_model_file, run, model, errors):
+    try:
+        write_run_model_file(run, model)
+    except BrokenPipeError:
+        pass # solver stopped reading, which shows up in its log
+    except Exception as e:
+        errors.append(e)
+
+def _read_fifo(fo, chunks):
+    with fo:
+        chunks.append(fo.read())
+
+async def _stream_log(proc, run):
+    async for line in proc.stdout:
+        run.log_line(line.decode(errors='replace'))
+    await proc.wait()
+
+def _solver_float(value, infinity=1e50):
+    """
+    :return: float of a value in a solver log, or None for missing ('-') or infinite values
+    """
+    if value == '-':
+        return None
+    value = float(value)
+    return value if abs(value) < infinity else None
+
+
 # mapping (in the future there may be multiple solver options)
 Gurobi = GurobiCL
 Cbc = CbcCL
+Highs = ScipyHighs
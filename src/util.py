@@ -3,6 +3,8 @@ Utility functions and constant values
 """
 from uuid import uuid4
 from time import strftime
+from contextlib import contextmanager
+import gc
 
 EPS = 1E-6
 
@@ -24,6 +26,28 @@ def verify_valid_name(name):
         raise RuntimeError(f'Name "{name}" is an invalid identifier')
     return
 
+def require_module(module, module_name):
+    """
+    Raise a helpful error when an optional dependency is missing
+    :param module: the imported module, or None if the import failed
+    :param module_name: name of the optional dependency
+    """
+    if module is None:
+        raise RuntimeError(f'This feature requires the optional dependency "{module_name}" (pip install {module_name})')
+
+@contextmanager
+def gc_paused():
+    """
+    Pause the cyclic garbage collector while allocating many objects in bulk
+    """
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+
 
 def run_summary(run, soln, model):
     if model.is_feasible(soln):
@@ -3,7 +3,12 @@ from math import inf
 from copy import copy
 from numbers import Number
 from collections import namedtuple
-from itertools import count
+from itertools import count, product
+
+try:
+    import numpy as np
+except ImportError: # numpy is an optional dependency, only required for array-backed features
+    np = None
 
 import pyflip as flp
 from .expression import Expression
@@ -11,6 +16,7 @@ from .expression import Expression
 class Variable(ABC):
     # this doesn't subclass Expression because it's fundamentally a different purpose object
     counter = count()
+    mutations = 0 # number of changes to the bounds or type of any variable after creation, which model fingerprints check
 
     @abstractmethod
     def __init__(self, name=None, continuous=True, lower_bound=-inf, upper_bound=inf):
@@ -19,12 +25,39 @@ class Variable(ABC):
 
         flp.util.verify_valid_name(name)
         self.name = name
-        self.lower_bound = lower_bound
-        self.upper_bound = upper_bound
-        self.continuous = continuous
+        self._lower_bound = lower_bound
+        self._upper_bound = upper_bound
+        self._continuous = continuous
 
         self._expr = Expression(self)
 
+    @property
+    def lower_bound(self):
+        return self._lower_bound
+
+    @lower_bound.setter
+    def lower_bound(self, val):
+        self._lower_bound = val
+        Variable.mutations += 1
+
+    @property
+    def upper_bound(self):
+        return self._upper_bound
+
+    @upper_bound.setter
+    def upper_bound(self, val):
+        self._upper_bound = val
+        Variable.mutations += 1
+
+    @property
+    def continuous(self):
+        return self._continuous
+
+    @continuous.setter
+    def continuous(self, val):
+        self._continuous = val
+        Variable.mutations += 1
+
     def value(self, soln=None):
         return self._expr.value(soln)
 
@@ -74,4 +107,237 @@ class Integer(Variable):
 
 class Binary(Integer):
     def __init__(self, name=None):
-        super().__init__(name, 0, 1)
\ No newline at end of file
+        super().__init__(name, 0, 1)
+
+class ArrayVariable(Variable):
+    """
+    Element of a VariableArray. Bounds and type are views into the arrays of the parent VariableArray
+    """
+    def __init__(self, array, offset, name):
+        # Variable.__init__ is bypassed: the name is validated once for the whole array
+        self.name = name
+        self._array = array
+        self._offset = offset
+
+    @property
+    def _expr(self):
+        return Expression(self)
+
+    @property
+    def lower_bound(self):
+        return float(self._array._lower_bounds[self._offset])
+
+    @lower_bound.setter
+    def lower_bound(self, val):
+        self._array._lower_bounds[self._offset] = val
+        Variable.mutations += 1
+
+    @property
+    def upper_bound(self):
+        return float(self._array._upper_bounds[self._offset])
+
+    @upper_bound.setter
+    def upper_bound(self, val):
+        self._array._upper_bounds[self._offset] = val
+        Variable.mutations += 1
+
+    @property
+    def continuous(self):
+        return bool(self._array._continuous[self._offset])
+
+    @continuous.setter
+    def continuous(self, val):
+        self._array._continuous[self._offset] = val
+        Variable.mutations += 1
+
+    def __repr__(self):
+        return '{}({})[{}{}{}]'.format(
+            self.name,
+            self._array.kind.__name__,
+            self.lower_bound,
+            ',' if self.continuous else '..',
+            self.upper_bound)
+
+
+class VariableArray:
+    """
+    A family of variables created in a single call by Model.add_var_array.
+    Bounds and types are stored in flat arrays, and the model indices of the variables in an n-dimensional array,
+    which supports NumPy-style slicing (returning a VariableArray view) and dot products with coefficient arrays.
+    """
+    counter = count()
+    __array_ufunc__ = None # make numpy defer to __rmatmul__ for coefs @ x
+
+    def __init__(self, model, index_sets, kind=Continuous, lower_bound=-inf, upper_bound=inf, name=None):
+        """
+        :param model: Model to which the variables are added
+        :param index_sets: tuple with an index set (iterable of labels) for each dimension
+        :param kind: Continuous, Integer or Binary
+        :param lower_bound: scalar or array broadcastable to the array shape
+        :param upper_bound: scalar or array broadcastable to the array shape
+        :param name: base name, with variables named like name_label1_label2
+        """
+        flp.util.require_module(np, 'numpy')
+        if name is None:
+            name = f'var_array_{next(VariableArray.counter)}'
+
+        flp.util.verify_valid_name(name)
+        if kind not in (Continuous, Integer, Binary):
+            raise RuntimeError(f'Variable kind must be Continuous, Integer or Binary, not {kind}')
+
+        self.model = model
+        self.name = name
+        self.kind = kind
+        self.index_sets = tuple(list(index_set) for index_set in index_sets)
+        shape = tuple(len(index_set) for index_set in self.index_sets)
+
+        # names are validated per label rather than per variable
+        label_strs = []
+        for index_set in self.index_sets:
+            label_strs.append([str(label) for label in index_set])
+            for label_str in label_strs[-1]:
+                if not f'{name}_{label_str}'.isidentifier():
+                    raise RuntimeError(f'Label "{label_str}" does not produce a valid variable name')
+
+        names = ['_'.join((name,) + labels) for labels in product(*label_strs)]
+
+        if kind is Binary:
+            lower_bound, upper_bound = 0, 1
+        size = len(names)
+        self._lower_bounds = np.array(np.broadcast_to(lower_bound, shape), dtype=np.float64).reshape(size)
+        self._upper_bounds = np.array(np.broadcast_to(upper_bound, shape), dtype=np.float64).reshape(size)
+        self._continuous = np.full(size, kind is Continuous, dtype=bool)
+        with flp.util.gc_paused():
+            self._elements = [ArrayVariable(self, offset, var_name) for offset, var_name in enumerate(names)]
+            self.start = model.add_variable_block(self._elements, names)
+        self.indices = np.arange(self.start, self.start + size, dtype=np.int64).reshape(shape)
+
+    def _view(self, indices):
+        view = copy(self)
+        view.indices = indices
+        return view
+
+    @property
+    def shape(self):
+        return self.indices.shape
+
+    @property
+    def ndim(self):
+        return self.indices.ndim
+
+    @property
+    def size(self):
+        return self.indices.size
+
+    @property
+    def lower_bounds(self):
+        return self._lower_bounds[self.indices - self.start]
+
+    @property
+    def upper_bounds(self):
+        return self._upper_bounds[self.indices - self.start]
+
+    def set_bounds(self, lower_bound=None, upper_bound=None):
+        """
+        Vectorised update of the bounds of all variables in this array (or view)
+        :param lower_bound: scalar or array broadcastable to the array shape
+        :param upper_bound: scalar or array broadcastable to the array shape
+        """
+        offsets = self.indices - self.start
+        if lower_bound is not None:
+            self._lower_bounds[offsets] = lower_bound
+        if upper_bound is not None:
+            self._upper_bounds[offsets] = upper_bound
+        Variable.mutations += 1
+
+    def at(self, *labels):
+        """
+        :param labels: one label from each index set
+        :return: the Variable with these labels
+        """
+        positions = tuple(index_set.index(label) for index_set, label in zip(self.index_sets, labels))
+        return self._elements[int(np.ravel_multi_index(positions, [len(s) for s in self.index_sets]))]
+
+    def __getitem__(self, key):
+        indices = self.indices[key]
+        if isinstance(indices, np.ndarray):
+            return self._view(indices)
+
+        return self._elements[int(indices) - self.start]
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def variables(self):
+        """
+        :return: flat list of Variables in this array (or view)
+        """
+        return [self._elements[offset] for offset in (self.indices.ravel() - self.start).tolist()]
+
+    def sum(self):
+        """
+        :return: ArrayExpression summing all variables in this array (or view)
+        """
+        indices = self.indices.ravel()
+        return flp.ArrayExpression.from_arrays(self.model, indices, np.ones(len(indices)))
+
+    def dot(self, coefs):
+        """
+        Elementwise product with a coefficient array of the same shape, summed into a single expression
+        :param coefs: array-like
+        :return: ArrayExpression
+        """
+        coefs = np.broadcast_to(np.asarray(coefs, dtype=np.float64), self.shape)
+        return _row_expressions(self.model, self.indices.reshape(1, -1), coefs.reshape(1, -1))[0]
+
+    def __matmul__(self, coefs):
+        """ x @ coefs, for 1-dimensional coefs """
+        coefs = np.asarray(coefs, dtype=np.float64)
+        if coefs.ndim != 1 or self.ndim not in (1, 2):
+            return NotImplemented
+        if len(coefs) != self.shape[-1]:
+            raise RuntimeError(f'Shape mismatch in matmul between variable array {self.shape} and coefs {coefs.shape}')
+
+        indices = self.indices.reshape(-1, len(coefs))
+        exprs = _row_expressions(self.model, indices, np.broadcast_to(coefs, indices.shape))
+        return exprs[0] if self.ndim == 1 else exprs
+
+    def __rmatmul__(self, coefs):
+        """ coefs @ x, for 1- or 2-dimensional coefs """
+        coefs = np.asarray(coefs, dtype=np.float64)
+        if self.ndim in (1, 2) and coefs.ndim in (1, 2) and coefs.shape[-1] != self.shape[0]:
+            raise RuntimeError(f'Shape mismatch in matmul between coefs {coefs.shape} and variable array {self.shape}')
+
+        if self.ndim == 1 and coefs.ndim in (1, 2):
+            coefs_2d = coefs.reshape(-1, len(self))
+            exprs = _row_expressions(self.model, np.broadcast_to(self.indices, coefs_2d.shape), coefs_2d)
+            return exprs[0] if coefs.ndim == 1 else exprs
+        elif self.ndim == 2 and coefs.ndim == 1:
+            indices = self.indices.T
+            return _row_expressions(self.model, indices, np.broadcast_to(coefs, indices.shape))
+
+        return NotImplemented
+
+    def value(self, soln):
+        """
+        :return: array of variable values in this solution, with the shape of this array
+        """
+        return np.array([soln.get_val(var.name) for var in self.variables()], dtype=np.float64).reshape(self.shape)
+
+    def __repr__(self):
+        return f'{self.name}({self.kind.__name__})[shape={self.shape}]'
+
+
+def _row_expressions(model, index_matrix, coef_matrix):
+    """
+    Build one ArrayExpression per row of matching 2-D index and coefficient matrices, dropping zero coefficients
+    """
+    rows, cols = np.nonzero(coef_matrix)
+    row_ends = np.cumsum(np.bincount(rows, minlength=coef_matrix.shape[0]))
+    indices = np.split(index_matrix[rows, cols], row_ends[:-1])
+    coefs = np.split(coef_matrix[rows, cols], row_ends[:-1])
+    return [flp.ArrayExpression.from_arrays(model, i, c) for i, c in zip(indices, coefs)]
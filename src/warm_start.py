@@ -0,0 +1,90 @@
+import os
+
+import pyflip as flp
+
+
+class WarmStartManager:
+    """
+    Remembers the best solution found for each family of models, and passes it as the mipstart when another model
+    of the family is solved, e.g. in a rolling horizon where each re-solve is a modified copy of the last model:
+
+        warm_start = flp.WarmStartManager()
+        for model in models:
+            soln, run = warm_start.solve(solver, model)
+
+    A stored solution is mapped onto the new model by variable name. Variables no longer in the model are dropped,
+    and new variables are left for the solver to fill in
+    """
+    # statuses of runs whose solution is worth starting from
+    usable_statuses = (flp.RunStatus.OPTIMAL, flp.RunStatus.TIMELIMIT)
+
+    def __init__(self, family=None):
+        """
+        :param family: function of a model, returning the key of its family. Default is the model name.
+            Use flp.Model.fingerprint to only start from solutions of identical models
+        """
+        self.family = family or (lambda model: model.name)
+        self.best = {} # family -> (model fingerprint, objective value, Solution)
+
+    def _better(self, model, objective_value, than):
+        return objective_value > than if model.objective.dir == 'max' else objective_value < than
+
+    def record(self, model, soln, run=None):
+        """
+        Remember soln for the model's family if it's the best so far. A solution of a changed model (by fingerprint)
+        always replaces one of the previous model, as objective values of different models don't compare
+        :param run: Run of the solve. Solutions of runs which didn't finish optimal or at the time limit are ignored
+        :return: True if stored
+        """
+        if not soln.var_dict or (run is not None and run.term_status not in self.usable_statuses):
+            return False
+
+        key = self.family(model)
+        fingerprint = model.fingerprint()
+        objective_value = model.objective.value(soln)
+        previous = self.best.get(key)
+        if previous is not None and previous[0] == fingerprint and not self._better(model, objective_value, previous[1]):
+            return False
+
+        if isinstance(soln, flp.ArraySolution): # don't keep the old model alive
+            soln = soln.to_solution()
+        self.best[key] = (fingerprint, objective_value, soln)
+        return True
+
+    def mipstart(self, model):
+        """
+        :return: the best solution stored for the model's family, restricted to the model's variables, or None
+        """
+        previous = self.best.get(self.family(model))
+        if previous is None:
+            return None
+
+        variables = model.variables
+        var_dict = {name: val for name, val in previous[2].var_dict.items() if name in variables}
+        return flp.Solution(var_dict) if var_dict else None
+
+    def solve(self, solver, model, **solve_kwargs):
+        """
+        Solve with the family's best solution as the mipstart (unless one is given), and record the result.
+        The mipstart file is removed afterwards
+        :param solve_kwargs: passed to solver.solve
+        :return: Solution, Run
+        """
+        if solve_kwargs.get('mipstart') is None:
+            solve_kwargs['mipstart'] = self.mipstart(model)
+
+        soln, run = solver.solve(model, **solve_kwargs)
+        if solve_kwargs['mipstart'] is not None:
+            try:
+                os.remove(run.params.value_by_pyflip_name('mipstart'))
+            except FileNotFoundError:
+                pass
+
+        self.record(model, soln, run)
+        return soln, run
+
+    def __len__(self):
+        return len(self.best)
+
+    def __repr__(self):
+        return f'WarmStartManager with solutions for {len(self)} model families'
@@ -0,0 +1,258 @@
+"""
+Benchmark suite for model building, file IO, solution handling and the solve pipeline.
+The solve benchmarks use a fake CBC executable (fake_cbc.py), so the suite runs anywhere without a solver.
+
+Run all benchmarks and save the results:
+    python -m pyflip.test.benchmark --output results.json
+Compare against an earlier run (e.g. of a previous version):
+    python -m pyflip.test.benchmark --output new.json --compare results.json
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import timeit
+from datetime import datetime, timezone
+from statistics import median
+
+try:
+    import numpy as np
+except ImportError: # numpy is an optional dependency, only required for array-backed features
+    np = None
+
+import pyflip as flp
+
+FAKE_CBC = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fake_cbc.py')
+
+BENCHMARKS = {} # name -> (setup, sizes, requires_numpy)
+
+
+def benchmark(*sizes, requires_numpy=False):
+    """
+    Register a benchmark. The decorated setup function takes a size, does any untimed preparation,
+    and returns the function to time
+    """
+    def register(setup):
+        BENCHMARKS[setup.__name__] = (setup, sizes, requires_numpy)
+        return setup
+    return register
+
+
+class FakeCbc(flp.solver.CbcCL):
+    """
+    CBC solver interface which runs fake_cbc.py in place of the CBC executable
+    """
+    run_in_shell = False
+
+    def __init__(self, pyflip_params=None, solver_params=None, model_format='lp', io_mode='file'):
+        super().__init__(pyflip_params, solver_params, sys.executable, model_format, io_mode)
+
+    def build_args(self, run):
+        return [sys.executable, FAKE_CBC] + super().build_args(run)[1:]
+
+
+def knapsack_model(n_items, n_bags=10, seed=0):
+    """
+    Multiple knapsack: assign each item to at most one bag, maximising value, within bag sizes
+    """
+    rng = random.Random(seed)
+    values = [rng.randint(1, 100) for _ in range(n_items)]
+    sizes = [rng.randint(1, 50) for _ in range(n_items)]
+    bag_sizes = [rng.randint(50, 100) * n_items // 40 for _ in range(n_bags)]
+
+    model = flp.Model('Knapsack')
+    x = {(item, bag): flp.variable.Binary(f'x_{item}_{bag}') for item in range(n_items) for bag in range(n_bags)}
+    model += tuple(x.values())
+    model += flp.Objective('max', flp.tsum((values[item], x[item, bag]) for item in range(n_items) for bag in range(n_bags)))
+
+    for item in range(n_items):
+        model += flp.Constraint(flp.tsum((1, x[item, bag]) for bag in range(n_bags)), '<=', 1, name=f'assign_{item}')
+    for bag in range(n_bags):
+        model += flp.Constraint(flp.tsum((sizes[item], x[item, bag]) for item in range(n_items)), '<=', bag_sizes[bag], name=f'capacity_{bag}')
+
+    return model
+
+
+def greedy_solution(model):
+    # every item in the first bag, which is usually infeasible, so is_feasible checks every constraint
+    return flp.Solution({name: float(name.endswith('_0')) for name in model.variables})
+
+
+def _variables(n):
+    rng = random.Random(0)
+    return [rng.randint(1, 100) for _ in range(n)], [flp.variable.Binary(f'v{i}') for i in range(n)]
+
+
+@benchmark(1000, 10000, 100000)
+def esum(n):
+    coefs, variables = _variables(n)
+    return lambda: flp.esum(coef * var for coef, var in zip(coefs, variables))
+
+@benchmark(1000, 10000, 100000)
+def tsum(n):
+    coefs, variables = _variables(n)
+    return lambda: flp.tsum(zip(coefs, variables))
+
+@benchmark(1000, 10000, 100000)
+def operator_chain(n):
+    coefs, variables = _variables(n)
+    def build():
+        expr = flp.Expression()
+        for coef, var in zip(coefs, variables):
+            expr += coef * var - var / 2
+        return expr
+    return build
+
+@benchmark(100, 1000, 10000)
+def model_assembly(n):
+    return lambda: knapsack_model(n)
+
+@benchmark(100, 1000, 10000)
+def write_lp_file(n):
+    model = knapsack_model(n)
+    return lambda: flp.write_lp_file(model, io.StringIO())
+
+@benchmark(100, 1000, 10000)
+def write_mps_file(n):
+    model = knapsack_model(n)
+    return lambda: flp.write_mps_file(model, io.StringIO())
+
+@benchmark(100, 1000, 10000)
+def read_lp_file(n):
+    text = flp.write_lp_file(knapsack_model(n), io.StringIO()).getvalue()
+    return lambda: flp.read_lp_file(io.StringIO(text))
+
+@benchmark(100, 1000, 10000, requires_numpy=True)
+def read_mps_file(n):
+    text = flp.write_mps_file(knapsack_model(n), io.StringIO()).getvalue()
+    return lambda: flp.read_mps_file(io.StringIO(text))
+
+@benchmark(100, 1000, 10000)
+def read_solution(n):
+    model = knapsack_model(n)
+    solver = FakeCbc()
+    run = solver.prepare_run(model)
+    text = 'Optimal - objective value 0.00000000\n' + ''.join(
+        f'{i:>7} {name:<24} {1:>23} {0:>23}\n' for i, name in enumerate(model.variables))
+    return lambda: solver.read_output_files(run, model, io.StringIO(text))
+
+@benchmark(100, 1000, 10000)
+def is_feasible(n):
+    model = knapsack_model(n)
+    soln = greedy_solution(model)
+    return lambda: model.is_feasible(soln)
+
+@benchmark(100, 1000, 10000, requires_numpy=True)
+def compiled_is_feasible(n):
+    compiled = knapsack_model(n).compile()
+    x = compiled.solution_array(greedy_solution(compiled.model))
+    return lambda: compiled.is_feasible(x)
+
+@benchmark(100, 1000, 10000)
+def solve_fake_cbc(n):
+    model = knapsack_model(n)
+    solver = FakeCbc()
+    return lambda: solver.solve(model)
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=flp.ROOT_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(names=None, max_size=None, quick=False, repeat=5, output=None, verbose=True):
+    """
+    Run benchmarks, timing each size repeat times
+    :param names: benchmark names to run. Default is all
+    :param max_size: skip sizes above this
+    :param quick: only run the smallest size of each benchmark
+    :param output: optional filename to save the results as JSON
+    :return: results dict
+    """
+    results = {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'benchmarks': {},
+    }
+    for name in names or BENCHMARKS:
+        setup, sizes, requires_numpy = BENCHMARKS[name]
+        if requires_numpy and np is None:
+            continue
+
+        for size in sizes[:1] if quick else sizes:
+            if max_size is not None and size > max_size:
+                continue
+            times = timeit.repeat(setup(size), repeat=repeat, number=1)
+            key = f'{name}[{size}]'
+            results['benchmarks'][key] = {'min': min(times), 'median': median(times), 'repeat': repeat}
+            if verbose:
+                print(f'{key:<28} min {min(times):10.4f}s  median {median(times):10.4f}s')
+
+    if output is not None:
+        with open(output, 'w') as fo:
+            json.dump(results, fo, indent=2)
+
+    return results
+
+
+def compare(baseline, current, threshold=1.2):
+    """
+    Compare two sets of results by minimum time
+    :param baseline: results dict or JSON filename
+    :param current: results dict or JSON filename
+    :param threshold: time ratio above which a benchmark counts as a regression
+    :return: list of (benchmark key, time ratio current / baseline) for the regressions, and a printable report
+    """
+    baseline, current = (_load_results(results) for results in (baseline, current))
+    regressions = []
+    lines = [f'{"benchmark":<28} {"baseline":>10} {"current":>10} {"ratio":>7}']
+    for key, result in current['benchmarks'].items():
+        if key not in baseline['benchmarks']:
+            continue
+        before, after = baseline['benchmarks'][key]['min'], result['min']
+        ratio = after / before if before > 0 else float('inf')
+        flag = '  <- regression' if ratio > threshold else ''
+        if flag:
+            regressions.append((key, ratio))
+        lines.append(f'{key:<28} {before:10.4f} {after:10.4f} {ratio:7.2f}{flag}')
+
+    return regressions, '\n'.join(lines)
+
+
+def _load_results(results):
+    if isinstance(results, dict):
+        return results
+    with open(results) as fo:
+        return json.load(fo)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run the pyflip benchmark suite')
+    parser.add_argument('-k', dest='names', action='append', choices=sorted(BENCHMARKS), help='benchmark to run (repeatable)')
+    parser.add_argument('--max-size', type=int, help='skip sizes above this')
+    parser.add_argument('--quick', action='store_true', help='smallest sizes only, one repeat')
+    parser.add_argument('--repeat', type=int, default=5, help='timings per benchmark size')
+    parser.add_argument('--output', help='save results to this JSON file')
+    parser.add_argument('--compare', help='compare against results in this JSON file')
+    args = parser.parse_args(argv)
+
+    results = run(args.names, args.max_size, args.quick, 1 if args.quick else args.repeat, args.output)
+
+    if args.compare:
+        regressions, report = compare(args.compare, results)
+        print(report)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,53 @@
+"""
+Stand-in for the CBC executable, so that the solve pipeline can be tested and benchmarked without a solver.
+Takes CBC's command line (model file, then 'key value' parameters, 'solve', 'solution <file>'),
+prints a CBC-style log, and writes a CBC-style solution file setting every variable of the model to 0.
+Only uses the standard library, so it starts as fast as the interpreter does
+"""
+import re
+import sys
+from time import perf_counter
+
+_IDENTIFIER_RE = re.compile(r'(?<![\w.])[A-Za-z_][\w.\[\]]*:?')
+_LP_KEYWORDS = {'min', 'max', 'minimize', 'maximize', 'minimise', 'maximise', 'subject', 'to', 'st', 'bounds', 'bound',
+                'general', 'generals', 'gen', 'integer', 'integers', 'binary', 'binaries', 'bin', 'end', 'free',
+                'inf', 'infinity'}
+
+
+def lp_variable_names(fo):
+    """
+    :return: names of the variables in an LP file, in order of first appearance
+    """
+    names = {}
+    for line in fo:
+        line = line.split('\\', 1)[0]
+        for token in _IDENTIFIER_RE.findall(line):
+            if not token.endswith(':') and token.lower() not in _LP_KEYWORDS:
+                names[token] = None
+    return list(names)
+
+
+def main(args):
+    start = perf_counter()
+    model_filename = args[0]
+    soln_filename = args[args.index('solution') + 1] if 'solution' in args else None
+
+    print('Welcome to the fake CBC MILP Solver')
+    print(f'command line - fake_cbc {" ".join(args)}')
+    with open(model_filename) as fo:
+        names = lp_variable_names(fo)
+
+    print(f'Problem has {len(names)} columns')
+    print(f'Cbc0010I After 0 nodes, 1 on tree, 1e+50 best solution, best possible 0 ({perf_counter() - start:.2f} seconds)')
+    print(f'Cbc0012I Integer solution of 0 found by fake heuristic after 0 iterations and 0 nodes ({perf_counter() - start:.2f} seconds)')
+    print(f'Cbc0001I Search completed - best objective 0, took 0 iterations and 0 nodes ({perf_counter() - start:.2f} seconds)')
+    print('Result - Optimal solution found')
+
+    if soln_filename is not None:
+        with open(soln_filename, 'w') as fo:
+            fo.write('Optimal - objective value 0.00000000\n')
+            fo.writelines(f'{i:>7} {name:<24} {0:>23} {0:>23}\n' for i, name in enumerate(names))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
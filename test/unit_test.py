@@ -1,7 +1,22 @@
 import unittest
+import asyncio
+import io
+import os
+import gzip
+import tempfile
 from os import sys
 from pathlib import Path
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import scipy.sparse as sp
+except ImportError:
+    sp = None
+
 import pyflip as flp
 
 class TestModels:
@@ -69,6 +84,19 @@ class TestModels:
 
         return model
 
+    @staticmethod
+    def knapsack_model_1(n_items=40, n_knapsacks=5):
+        # a multi-dimensional knapsack with deterministic pseudo-random weights, needing some branching
+        model = flp.Model()
+        xs = [flp.variable.Binary(f'x{i}') for i in range(n_items)]
+        model += tuple(xs)
+
+        model += flp.Objective('max', flp.tsum([(10 + (37 * i) % 91, x) for i, x in enumerate(xs)]))
+        for k in range(n_knapsacks):
+            model += flp.Constraint(flp.tsum([(10 + (53 * i + 29 * k) % 89, x) for i, x in enumerate(xs)]), '<=', 600)
+
+        return model
+
 
 class Tests(unittest.TestCase):
     universal_solver = flp.solver.Cbc
@@ -83,6 +111,340 @@ class Tests(unittest.TestCase):
         expr /= 2
         self.assertIsInstance(expr, flp.Expression)
 
+    def test_inplace_expressions_1(self):
+        v1 = flp.variable.Continuous('v1', 10, 20)
+        v2 = flp.variable.Integer('v2', -10, 0)
+
+        expr = flp.Expression()
+        expr_id = id(expr)
+        for i in range(10):
+            expr += i * v1
+            expr.add_term(2, v2)
+        expr -= v1
+        expr += 5
+        expr *= 2
+        expr /= 4
+
+        self.assertEqual(id(expr), expr_id)
+        self.assertEqual(expr.var_dict, {'v1': 22.0, 'v2': 10.0})
+        self.assertEqual(expr.constant, 2.5)
+
+        # tsum and esum merge repeated variables
+        self.assertEqual(flp.tsum([(1, v1), (2, v1)]).var_dict, {'v1': 3})
+        self.assertEqual(flp.esum([v1 + v2, 2 * v1]).var_dict, {'v1': 3.0, 'v2': 1.0})
+
+    @unittest.skipIf(np is None, 'requires numpy')
+    def test_inplace_array_expressions_1(self):
+        model = flp.Model()
+        vs = [flp.variable.Continuous(f'v{i}') for i in range(50)]
+        model.add_variables(*vs)
+
+        expr = flp.ArrayExpression(model)
+        for i, v in enumerate(vs):
+            expr.add_term(i, v)
+            expr += v
+        expr -= 2 * vs[0]
+        expr.add_terms([1, 1], [3, 4])
+        expr *= 2
+
+        expected = {v.name: 2.0 * (i + 1) for i, v in enumerate(vs)}
+        expected['v0'] = -2.0
+        expected['v3'] += 2.0
+        expected['v4'] += 2.0
+        self.assertEqual(expr.to_expression().var_dict, expected)
+
+    @unittest.skipIf(np is None, 'requires numpy')
+    def test_array_expressions_1(self):
+        model = flp.Model()
+        v1 = flp.variable.Continuous('v1', 10, 20)
+        v2 = flp.variable.Integer('v2', -10, 0)
+        v3 = flp.variable.Binary('v3')
+        model.add_variables(v1, v2, v3)
+
+        expr = flp.ArrayExpression(model, v1) + 2 * v2 - 3 * v3 + 3
+        expr -= 10 * v2
+        expr = (v1 + expr) / 2
+        self.assertIsInstance(expr, flp.ArrayExpression)
+        self.assertEqual(list(model.var_index.values()), [0, 1, 2])
+
+        soln = flp.Solution({'v1': 10, 'v2': -1, 'v3': 1})
+        dict_expr = (v1 + (v1 + 2 * v2 - 3 * v3 + 3 - 10 * v2)) / 2
+        self.assertAlmostEqual(expr.value(soln), dict_expr.value(soln))
+        self.assertEqual(expr.to_expression().var_dict, dict_expr.var_dict)
+
+        # ArrayExpressions convert when used in objectives and constraints
+        model += flp.Objective('max', expr)
+        model += flp.Constraint(flp.asum(model, [v1, 2 * v3, expr]), '<=', 5)
+        self.assertEqual(model.objective.expr.var_dict, dict_expr.var_dict)
+
+    @unittest.skipIf(np is None, 'requires numpy')
+    def test_var_array_1(self):
+        model = flp.Model()
+        x = model.add_var_array((['a', 'b'], 3), flp.variable.Integer, lower_bound=0, upper_bound=[1, 2, 3], name='x')
+        y = model.add_var_array(2, name='y')
+
+        self.assertEqual(model.num_vars(), 8)
+        self.assertEqual(x.shape, (2, 3))
+        self.assertIs(x[1, 2], model.variables['x_b_2'])
+        self.assertIs(x.at('b', 2), model.variables['x_b_2'])
+        self.assertEqual(x[:, 1].shape, (2,))
+        self.assertEqual(model.variables['x_a_2'].upper_bound, 3.0)
+        self.assertFalse(model.variables['x_a_2'].continuous)
+
+        x[0].set_bounds(upper_bound=5)
+        self.assertEqual(x.upper_bounds.tolist(), [[5, 5, 5], [1, 2, 3]])
+
+        expr = np.array([1, 0, 2]) @ x[0]
+        self.assertEqual(expr.to_expression().var_dict, {'x_a_0': 1.0, 'x_a_2': 2.0})
+        exprs = np.array([[1, 1], [0, 3]]) @ y
+        self.assertEqual([e.to_expression().var_dict for e in exprs], [{'y_0': 1.0, 'y_1': 1.0}, {'y_1': 3.0}])
+        self.assertEqual(len(x @ [1, 1, 1]), 2)
+        self.assertEqual(len([1, 1] @ x), 3)
+        with self.assertRaises(RuntimeError):
+            x @ np.ones(2)
+        with self.assertRaises(RuntimeError):
+            np.ones((2, 3)) @ y
+        with self.assertRaises(RuntimeError):
+            np.array([1, 2, 3, 4]) @ y
+
+        model += flp.Constraint(x.sum() + y[0], '<=', 4)
+        with self.assertRaises(RuntimeError):
+            model.add_var_array(2, name='y')
+
+    @unittest.skipIf(np is None, 'requires numpy')
+    def test_compiled_model(self):
+        model = TestModels.knapsack_model_1(n_items=12, n_knapsacks=3)
+        xs = [model.variables[f'x{i}'] for i in range(12)]
+        model += flp.Constraint(xs[0] + 2, '=', xs[1] - xs[2], name='balance')
+        model.add_constraints_from_matrix(([0, 0, 1], [3, 4, 5], [1, 1, 1]), ['<=', '>='], [1, 1], name='pairs')
+        compiled = model.compile()
+        self.assertEqual(compiled.num_rows(), model.num_cons())
+
+        rng = np.random.default_rng(0)
+        solns = [flp.Solution({f'x{i}': float(v) for i, v in enumerate(values)}) for values in rng.integers(0, 2, (20, 12))]
+        solns.append(flp.Solution({f'x{i}': float(i in (1, 5)) for i in range(12)})) # 0 + 2 = 1 - 0 fails, everything else holds
+        feasible = compiled.is_feasible(solns)
+        self.assertEqual(feasible.tolist(), [model.is_feasible(soln) for soln in solns])
+        self.assertEqual(compiled.is_feasible(solns[-1]), model.is_feasible(solns[-1]))
+
+        for soln in solns[:5] + solns[-1:]:
+            violated = {compiled.row_names[row] for row in compiled.violated_rows(soln)}
+            self.assertEqual(violated, {name for name, con in model.constraints.items() if not con.is_satisfied(soln)})
+            self.assertAlmostEqual(compiled.objective_values(soln), model.objective.value(soln))
+
+        x = compiled.solution_array(solns)
+        self.assertEqual(x.shape, (21, 12))
+        self.assertTrue(np.allclose(compiled.objective_values(x), [model.objective.value(soln) for soln in solns]))
+        self.assertEqual([rows.tolist() for rows in compiled.violated_rows(x)], [compiled.violated_rows(row).tolist() for row in x])
+
+        slacks = compiled.slacks(solns[-1])
+        self.assertEqual(slacks[compiled.row_names.index('balance')], -1.0)
+        self.assertEqual(compiled.violations(solns[-1]).tolist().count(0.0), compiled.num_rows() - 1)
+
+        with self.assertRaises(RuntimeError):
+            compiled.activities(np.zeros(5))
+
+    @unittest.skipIf(np is None, 'requires numpy')
+    def test_array_solution(self):
+        model = TestModels.ip_model_1()
+        soln = flp.ArraySolution.from_names_values(model, ['v2'], ['-2'])
+        self.assertEqual(soln.values.tolist(), [0.0, -2.0])
+        self.assertEqual(soln.var_dict, {'v1': 0.0, 'v2': -2.0})
+        self.assertEqual(model.objective.value(soln), -2.0)
+        self.assertFalse(model.is_feasible(soln))
+
+        soln.set_var('v1', 1)
+        self.assertEqual(soln.get_val('v1'), 1.0)
+        self.assertTrue(model.is_feasible(soln))
+        self.assertIs(soln.index, flp.ArraySolution(model).index) # shared, not copied
+        self.assertEqual(flp.ArraySolution.from_solution(model, soln.to_solution()).values.tolist(), [1.0, -2.0])
+        with self.assertRaises(KeyError):
+            soln.set_var('v3', 1)
+        with self.assertRaises(RuntimeError):
+            flp.ArraySolution(model, [1, 2, 3])
+
+        compiled = model.compile()
+        self.assertTrue(np.shares_memory(compiled.solution_array(soln), soln.values))
+        self.assertEqual(compiled.objective_values([soln, soln.copy()]).tolist(), [-2.0, -2.0])
+
+        s = Tests.universal_solver({'time_limit': 10})
+        s.array_solutions = True
+        soln, run = s.solve(model)
+        self.assertIsInstance(soln, flp.ArraySolution)
+        self.assertEqual(soln.values.tolist(), [1.0, -2.0])
+
+    @unittest.skipIf(np is None, 'requires numpy')
+    def test_solution_pool(self):
+        model = TestModels.knapsack_model_1(n_items=20, n_knapsacks=2)
+        model += flp.variable.Continuous('slack', 0, 10)
+        rng = np.random.default_rng(2)
+        x = rng.integers(0, 2, (50, 21)).astype(float)
+        x[:, 20] = rng.uniform(0, 10, 50)
+        x[10] = x[3] # duplicate
+        objectives = x @ model.compile().objective_coefs
+
+        pool = flp.SolutionPool(model)
+        added = [pool.add(row) for row in x]
+        self.assertEqual(added.count(False), 1)
+        self.assertFalse(added[10])
+        self.assertEqual(len(pool), 49)
+        self.assertIn(x[3], pool)
+        self.assertEqual(pool.bits.shape[1], 3) # 20 binaries in 3 bytes
+
+        # best first, with the values intact
+        order = np.argsort(-np.delete(objectives, 10), kind='stable')
+        self.assertTrue(np.allclose(pool.values(), np.delete(x, 10, axis=0)[order]))
+        self.assertAlmostEqual(model.objective.value(pool.best()), objectives.max())
+
+        query = flp.ArraySolution(model, x[0])
+        stored = pool.values()
+        self.assertEqual(pool.hamming(query).tolist(), (stored[:, :20] != x[0, :20]).sum(axis=1).tolist())
+        self.assertTrue(np.allclose(pool.l1(query), np.abs(stored - x[0]).sum(axis=1)))
+        pairs = [(stored[i, :20] != stored[j, :20]).sum() for i in range(49) for j in range(i + 1, 49)]
+        self.assertAlmostEqual(pool.diversity(), np.mean(pairs))
+
+        # with a capacity, only the top k are kept
+        top = flp.SolutionPool(model, capacity=5)
+        for row in x:
+            top.add(flp.ArraySolution(model, row).to_solution())
+        self.assertEqual(len(top), 5)
+        self.assertTrue(np.allclose(top.objectives[top.slots()], np.sort(objectives)[::-1][:5]))
+        self.assertFalse(top.add(x[np.argmin(objectives)]))
+
+        # the best solution can be a mipstart
+        s = Tests.universal_solver({'time_limit': 10})
+        soln, run = s.solve(model, mipstart=top.best())
+        os.remove(run.params.value_by_pyflip_name('mipstart'))
+        self.assertEqual(run.term_status, flp.RunStatus.OPTIMAL)
+
+    @unittest.skipIf(np is None, 'requires numpy')
+    def test_delta_evaluator(self):
+        model = TestModels.knapsack_model_1(n_items=30, n_knapsacks=4)
+        model.add_constraints_from_matrix(([0, 0, 1], [3, 4, 5], [1, 1, 1]), ['<=', '>='], [1, 1], name='pairs')
+        compiled = model.compile()
+        evaluator = flp.DeltaEvaluator(compiled, flp.Solution({f'x{i}': 0.0 for i in range(30)}))
+        self.assertEqual(evaluator.n_violated, 1) # pairs_1
+        self.assertFalse(evaluator.is_feasible())
+
+        rng = np.random.default_rng(1)
+        for step in range(200):
+            flips = rng.choice(30, size=rng.integers(1, 4), replace=False)
+            changes = {f'x{i}': 1.0 - evaluator.values[i] for i in flips}
+            objective_before, violation_before = evaluator.objective_value, evaluator.total_violation
+            objective_delta, violation_delta = evaluator.try_move(changes)
+            self.assertAlmostEqual(evaluator.objective_value, objective_before + objective_delta)
+            if step % 3:
+                evaluator.commit()
+            else:
+                evaluator.rollback()
+                self.assertEqual((evaluator.objective_value, evaluator.total_violation), (objective_before, violation_before))
+
+            # matches evaluation from scratch
+            self.assertTrue(np.allclose(evaluator.activities, compiled.activities(evaluator.values)))
+            self.assertAlmostEqual(evaluator.total_violation, compiled.violations(evaluator.values).sum())
+            self.assertEqual(evaluator.violated_rows().tolist(), compiled.violated_rows(evaluator.values).tolist())
+            self.assertEqual(evaluator.n_violated, len(compiled.violated_rows(evaluator.values)))
+
+        soln = evaluator.solution()
+        self.assertEqual(model.is_feasible(soln), evaluator.is_feasible())
+        self.assertAlmostEqual(model.objective.value(soln), evaluator.objective_value)
+
+        # an uncommitted move is rolled back by the next one
+        evaluator.try_move({model.variables['x0']: 5.0})
+        evaluator.try_move({1: evaluator.values[1]})
+        self.assertEqual(evaluator.values[0], soln.var_dict['x0'])
+
+    def test_build_profile(self):
+        model = flp.Model()
+        xs = [flp.variable.Continuous(f'x{i}', 0, 1) for i in range(10)]
+        model += tuple(xs)
+
+        with model.profile() as profile:
+            for i in range(3):
+                model += flp.Constraint(xs[i] + xs[i + 1], '<=', 1, name=f'pair_{i}')
+            for i in range(2):
+                model += flp.Constraint(flp.tsum([(j, xs[j]) for j in range(10)]), '>=', i, name=f'weighted_{i}_0')
+            model += flp.Objective('max', flp.tsum([(1, x) for x in xs]))
+            flp.Expression(xs[0])
+
+        self.assertEqual(set(profile.families), {'pair', 'weighted', 'objective', 'other'})
+        self.assertEqual(profile.families['pair']['constraints'], 3)
+        self.assertEqual(profile.families['pair']['rearrange_ineq'], 3)
+        self.assertEqual(profile.families['pair']['test_defined_variables'], 6)
+        self.assertEqual(profile.families['weighted']['checked_terms'], 2 * 10)
+        self.assertGreater(profile.families['weighted']['dict_copies'], 0)
+        self.assertEqual(profile.families['other']['expressions'], 1)
+        self.assertEqual(len(profile.report().splitlines()), 5)
+
+        # profiling stops on exit
+        self.assertIs(flp.Expression.__init__, flp.Expression.__dict__['__init__'])
+        model += flp.Constraint(xs[0], '<=', 1, name='pair_3')
+        self.assertEqual(profile.families['pair']['constraints'], 3)
+        self.assertEqual(flp.constraint_family('x_b_2'), 'x_b')
+
+    @unittest.skipIf(np is None, 'requires numpy')
+    def test_constraints_from_matrix_1(self):
+        model = flp.Model()
+        x = model.add_var_array(3, lower_bound=0, name='x')
+
+        block = model.add_constraints_from_matrix(([0, 0, 1, 1, 1], [0, 2, 1, 1, 2], [1, 2, 3, 4, 1]), ['<=', '>='], [1, 2], names=['a', 'b'])
+        model.add_constraints_from_matrix(np.eye(3), '>=', 0)
+
+        self.assertEqual(model.num_cons(), 5)
+        self.assertEqual(block.num_rows(), 2)
+        self.assertEqual(block.indices.tolist(), [0, 2, 1, 2])
+        self.assertEqual(block.data.tolist(), [1.0, 2.0, 7.0, 1.0])
+        self.assertEqual(model.constraints['b'].lhs.var_dict, {'x_1': 7.0, 'x_2': 1.0})
+        self.assertEqual(model.constraints['b'].mid, '>=')
+        self.assertEqual(model.constraints['b'].rhs.constant, 2.0)
+
+        soln = flp.Solution({'x_0': 1, 'x_1': 0.5, 'x_2': 0})
+        self.assertTrue(model.is_feasible(soln))
+        soln.set_var('x_2', 1)
+        self.assertFalse(model.is_feasible(soln))
+
+        with self.assertRaises(RuntimeError):
+            model.add_constraints_from_matrix(np.eye(4), '<=', 0) # 4 columns but only 3 variables
+        with self.assertRaises(RuntimeError):
+            model.add_constraints_from_matrix(np.eye(3), '<=', 0, names=['a', 'c', 'd']) # duplicate name
+        with self.assertRaises(RuntimeError):
+            model.add_constraints_from_matrix(([], [], []), '<=', 0) # number of rows unknown
+
+        # trailing empty rows are kept when the number of rows is given by senses
+        empty_block = model.add_constraints_from_matrix(([0], [1], [1.0]), ['<=', '<='], 0)
+        self.assertEqual(empty_block.num_rows(), 2)
+
+        # row expressions don't share the block arrays
+        expr = block.row_array_expression(0)
+        expr *= 10
+        self.assertEqual(block.data.tolist(), [1.0, 2.0, 7.0, 1.0])
+
+    @unittest.skipIf(np is None or sp is None, 'requires numpy and scipy')
+    def test_constraints_from_sparse_matrix(self):
+        model = flp.Model()
+        model.add_var_array(3, name='x')
+        A = sp.csr_matrix((np.array([1.0, 2.0, 3.0]), np.array([2, 0, 2]), np.array([0, 3])), shape=(1, 3))
+
+        block = model.add_constraints_from_matrix(A, '<=', [1])
+        self.assertEqual(A.nnz, 3) # caller's matrix is not modified
+        self.assertEqual(block.indices.tolist(), [0, 2])
+        self.assertEqual(block.data.tolist(), [2.0, 4.0])
+        A.data[:] = 0
+        self.assertEqual(block.data.tolist(), [2.0, 4.0])
+
+    @unittest.skipIf(np is None, 'requires numpy')
+    def test_solve_constraints_from_matrix_1(self):
+        model = flp.Model()
+        v = model.add_var_array(2, lower_bound=10, upper_bound=20, name='v')
+        model += flp.Objective('max', v.sum())
+        model.add_constraints_from_matrix(np.array([[2, 1]]), '<=', [50])
+
+        s = Tests.universal_solver({'time_limit': 10})
+        soln, run = s.solve(model)
+
+        self.assertEqual(run.term_status, flp.RunStatus.OPTIMAL)
+        self.assertEqual(model.objective.value(soln), 35.0)
+
     def test_model_1(self):
         model = flp.Model()
         v1 = flp.variable.Continuous('v1', 10, 20)
@@ -124,6 +486,78 @@ class Tests(unittest.TestCase):
         self.assertEqual(p.is_file(), True)
         p.unlink()
 
+    @unittest.skipIf(np is None, 'requires numpy')
+    def test_write_blocks_with_same_name(self):
+        model = flp.Model()
+        model.add_var_array(3, lower_bound=0, name='x')
+        model.add_constraints_from_matrix(np.array([[1.0, 0, 0]]), '<=', [1], names=['a'], name='blk')
+        model.add_constraints_from_matrix(np.array([[0, 0, 5.0]]), '>=', [2], names=['b'], name='blk')
+
+        fp = io.StringIO()
+        flp.write_lp_file(model, fp)
+        self.assertIn('  b: 5.0 x_2 >= +2.0', fp.getvalue().splitlines())
+
+        fp = io.StringIO()
+        flp.write_mps_file(model, fp)
+        lines = fp.getvalue().splitlines()
+        self.assertIn('    x_2 b 5.0', lines)
+        self.assertIn('    RHS b 2.0', lines)
+
+    def test_write_to_stream(self):
+        model = flp.Model()
+        vs = [flp.variable.Continuous(f'long_variable_name_{i}', 0, 0.1) for i in range(50)]
+        model.add_variables(*vs)
+        model += flp.Objective('max', flp.tsum((0.1, v) for v in vs))
+        model += flp.Constraint(flp.tsum((1, v) for v in vs), '<=', 3)
+
+        fp = io.StringIO()
+        flp.write_lp_file(model, fp, max_line_length=100)
+        lines = fp.getvalue().splitlines()
+        self.assertTrue(all(len(line) <= 100 for line in lines))
+        self.assertEqual(lines[-1], 'end')
+        self.assertIn('  0 <= long_variable_name_0 <= 0.1', lines)
+
+        fp = io.BytesIO()
+        flp.write_lp_file(model, fp, float_format='%.17g')
+        self.assertIn(b'  0 <= long_variable_name_0 <= 0.10000000000000001', fp.getvalue().splitlines())
+
+    def test_read_lp_file(self):
+        model = TestModels.ip_model_1()
+        fp = io.StringIO()
+        flp.write_lp_file(model, fp)
+        fp.seek(0)
+        read_model = flp.read_lp_file(fp, chunk_size=16) # small chunks to exercise statements split across reads
+
+        self.assertEqual(read_model.num_vars(), model.num_vars())
+        self.assertEqual(read_model.num_cons(), model.num_cons())
+        self.assertEqual(read_model.objective.dir, model.objective.dir)
+        self.assertEqual(read_model.objective.expr.var_dict, model.objective.expr.var_dict)
+        for name, con in model.constraints.items():
+            self.assertEqual(read_model.constraints[name]._lhs.var_dict, con._lhs.var_dict)
+            self.assertEqual(read_model.constraints[name]._rhs.constant, con._rhs.constant)
+        for name, var in model.variables.items():
+            self.assertIs(type(read_model.variables[name]), type(var))
+
+        lp_text = '\\ hand-written\nMinimize\n obj: 3x + 2 y\n  - 1e-1 z + 4\nSubject To\n c1: x + y >= 1\n -x+y<=2\n' \
+                  'Bounds\n -inf <= z <= 5\n y free\nGenerals\n x\nEnd\n'
+        read_model = flp.read_lp_file(io.StringIO(lp_text))
+        self.assertEqual(read_model.objective.expr.var_dict, {'x': 3.0, 'y': 2.0, 'z': -0.1})
+        self.assertEqual(read_model.objective.expr.constant, 4.0)
+        self.assertEqual(read_model.constraints['c1'].rhs.constant, 1.0)
+        self.assertEqual(read_model.num_cons(), 2)
+        self.assertIsInstance(read_model.variables['x'], flp.variable.Integer)
+        self.assertEqual((read_model.variables['y'].lower_bound, read_model.variables['y'].upper_bound), (-float('inf'), float('inf')))
+
+    def test_solve_read_lp_file(self):
+        fp = io.StringIO()
+        flp.write_lp_file(TestModels.ip_model_1(), fp)
+        fp.seek(0)
+        read_model = flp.read_lp_file(fp)
+
+        soln, run = Tests.universal_solver({'time_limit': 10}).solve(read_model)
+        self.assertEqual(run.term_status, flp.RunStatus.OPTIMAL)
+        self.assertEqual(read_model.objective.value(soln), -2.0)
+
     def test_solve_lp_1(self):
         model = TestModels.lp_model_1()
         s = Tests.universal_solver({'time_limit': 10})
@@ -145,6 +579,402 @@ class Tests(unittest.TestCase):
         self.assertEqual(model.variables['v1'].value(soln), 1.0)
         self.assertEqual(model.variables['v2'].value(soln), -2.0)
 
+    def test_solve_mps_1(self):
+        for model, obj_value in ((TestModels.lp_model_1(), 35.0), (TestModels.ip_model_1(), -2.0)):
+            s = Tests.universal_solver({'time_limit': 10}, model_format='mps')
+            soln, run = s.solve(model)
+
+            self.assertEqual(run.term_status, flp.RunStatus.OPTIMAL)
+            self.assertEqual(model.objective.value(soln), obj_value)
+            self.assertEqual(run.params.value_by_pyflip_name('output_lp_file'), run.params.value_by_pyflip_name('output_model_file'))
+
+    def test_solve_sequence(self):
+        models = [TestModels.lp_model_1(), TestModels.ip_model_1(), TestModels.lp_model_1()]
+        s = Tests.universal_solver({'time_limit': 10})
+
+        results = list(s.solve_sequence(models))
+        self.assertEqual([model.objective.value(soln) for model, (soln, run) in zip(models, results)], [35.0, -2.0, 35.0])
+        self.assertTrue(all(run.term_status == flp.RunStatus.OPTIMAL for soln, run in results))
+
+        # stopping early removes the model file already written for the next solve
+        solves = s.solve_sequence(models)
+        next(solves)
+        solves.close()
+        self.assertEqual(list(Path('.').glob('Model_*.lp')), [])
+
+    def test_solve_async(self):
+        models = [TestModels.lp_model_1(), TestModels.ip_model_1()]
+        s = Tests.universal_solver({'time_limit': 10})
+
+        async def solve_all():
+            return await asyncio.gather(*(s.solve_async(model) for model in models))
+
+        results = asyncio.run(solve_all())
+        self.assertEqual([model.objective.value(soln) for model, (soln, run) in zip(models, results)], [35.0, -2.0])
+        self.assertTrue(all(run.term_status == flp.RunStatus.OPTIMAL for soln, run in results))
+        self.assertTrue(any(line.startswith('Optimal objective 35') for line in results[0][1].log))
+
+        if os.name == 'posix':
+            slow_solver = Path('slow_solver.sh')
+            slow_solver.write_text('#!/bin/sh\nexec sleep 30\n')
+            slow_solver.chmod(0o755)
+            try:
+                s = Tests.universal_solver(path_to_solver=str(slow_solver.resolve()))
+                soln, run = asyncio.run(s.solve_async(models[0], timeout=0.5))
+                self.assertEqual(run.term_status, flp.RunStatus.TIMELIMIT)
+                self.assertLess(run.solve_duration, 10)
+
+                # cancelling kills the solver and removes the run's files
+                directory = Path('cancelled_runs')
+                directory.mkdir()
+                async def cancel_solve():
+                    task = asyncio.ensure_future(s.solve_async(models[0], directory=str(directory)))
+                    await asyncio.sleep(0.5)
+                    task.cancel()
+                    with self.assertRaises(asyncio.CancelledError):
+                        await task
+
+                asyncio.run(cancel_solve())
+                self.assertEqual(list(directory.iterdir()), [])
+                directory.rmdir()
+            finally:
+                slow_solver.unlink()
+
+    def test_log_streaming(self):
+        s = Tests.universal_solver({'time_limit': 10})
+        lines, events = [], []
+        s.on_log_line = lambda run, line: lines.append(line)
+        s.on_progress = lambda run, event: events.append(event)
+
+        max_lines = flp.Run.log_max_lines
+        flp.Run.log_max_lines = 5
+        try:
+            soln, run = s.solve(TestModels.knapsack_model_1(), keep_log_file=True)
+        finally:
+            flp.Run.log_max_lines = max_lines
+
+        # the whole log goes to the callback and the log file, with only the end kept in memory
+        with open(run.params.value_by_pyflip_name('output_log_file')) as fo:
+            self.assertEqual(fo.read().splitlines(), lines)
+        self.assertEqual(run.log, lines[-5:])
+        self.assertEqual(run.log[-1], 'PyFlip: Run ended')
+        os.remove(run.params.value_by_pyflip_name('output_log_file'))
+
+        self.assertTrue(events)
+        self.assertIs(run.progress, events[-1])
+        self.assertAlmostEqual(abs(run.progress.primal), TestModels.knapsack_model_1().objective.value(soln))
+        self.assertTrue(all(a.time <= b.time for a, b in zip(events, events[1:])))
+
+        if self.universal_solver is flp.solver.Cbc:
+            fields = s.parse_progress_line('Cbc0010I After 100 nodes, 3 on tree, -90 best solution, best possible -100 (1.50 seconds)')
+            self.assertEqual(fields, {'time': 1.5, 'primal': -90.0, 'dual': -100.0, 'nodes': 100})
+            run.update_progress(fields)
+            self.assertAlmostEqual(run.progress.gap, 10 / 90)
+
+    def test_run_timings(self):
+        class RecordingHooks(flp.RunHooks):
+            def __init__(self):
+                self.phases = []
+                self.finished = []
+
+            def phase_ended(self, run, phase, duration):
+                self.phases.append(phase)
+
+            def run_finished(self, run):
+                self.finished.append(run)
+
+        hooks = RecordingHooks()
+        s = Tests.universal_solver({'time_limit': 10})
+        s.hooks.append(hooks)
+        mipstart = flp.Solution({'v1': 0, 'v2': 10})
+        soln, run = s.solve(TestModels.ip_model_1(), mipstart=mipstart)
+        os.remove(run.params.value_by_pyflip_name('mipstart'))
+
+        self.assertEqual(hooks.phases, ['write_mipstart', 'write_model', 'launch', 'solve', 'read_solution', 'delete_files'])
+        self.assertEqual(hooks.finished, [run])
+        self.assertEqual(set(run.timings), set(hooks.phases))
+        self.assertEqual(run.timings['solve'], run.solve_duration)
+        self.assertTrue(all(duration >= 0 for duration in run.timings.values()))
+        self.assertEqual(set(run.file_sizes), {'mipstart_file', 'model_file', 'soln_file', 'log_file'})
+        self.assertTrue(all(size > 0 for size in run.file_sizes.values()))
+
+    def test_benchmark_suite(self):
+        from pyflip.test import benchmark
+
+        soln, run = benchmark.FakeCbc().solve(benchmark.knapsack_model(20, 3))
+        self.assertEqual(run.term_status, flp.RunStatus.OPTIMAL)
+        self.assertEqual(len(soln.var_dict), 60)
+        self.assertEqual(run.progress.nodes, 0)
+
+        results = benchmark.run(['tsum', 'solve_fake_cbc'], quick=True, repeat=1, verbose=False)
+        self.assertEqual(list(results['benchmarks']), ['tsum[1000]', 'solve_fake_cbc[100]'])
+
+        slower = {'benchmarks': {key: dict(result, min=2 * result['min']) for key, result in results['benchmarks'].items()}}
+        regressions, report = benchmark.compare(results, slower)
+        self.assertEqual([key for key, ratio in regressions], ['tsum[1000]', 'solve_fake_cbc[100]'])
+
+    def test_progress_series(self):
+        run = flp.Run('progress')
+        run.update_progress({'time': 0.5, 'dual': -100.0, 'nodes': 0})
+        run.update_progress({'time': 1.0, 'primal': -90.0, 'nodes': 10})
+
+        self.assertEqual(run.progress_series['primal'][1], -90.0)
+        self.assertEqual(run.progress_series['dual'].tolist(), [-100.0, -100.0])
+
+        fo = io.StringIO()
+        run.write_progress_csv(fo)
+        self.assertEqual(fo.getvalue().splitlines(), ['run,time,primal,dual,gap,nodes',
+                                                      f'{run.name},0.5,,-100.0,,0.0',
+                                                      f'{run.name},1.0,-90.0,-100.0,{10 / 90!r},10.0'])
+
+        if np is not None:
+            arrays = run.progress_arrays()
+            self.assertEqual(arrays['nodes'].tolist(), [0.0, 10.0])
+            self.assertTrue(np.isnan(arrays['primal'][0]))
+
+    def test_solve_many(self):
+        models = [TestModels.lp_model_1(), TestModels.ip_model_1()] * 3
+        s = Tests.universal_solver({'time_limit': 10})
+
+        results = list(s.solve_many(models, max_workers=2, total_threads=2, ordered=True))
+        self.assertEqual([model.objective.value(soln) for model, (soln, run) in zip(models, results)], [35.0, -2.0] * 3)
+        self.assertTrue(all(run.term_status == flp.RunStatus.OPTIMAL for soln, run in results))
+        self.assertTrue(all(run.params.value_by_pyflip_name('threads') == 1 for soln, run in results))
+
+        # each worker writes to its own directory, removed again once the solves are done
+        directories = {Path(run.params.value_by_pyflip_name('output_model_file')).parent for soln, run in results}
+        self.assertLessEqual(len(directories), 2)
+        self.assertFalse(any(directory.exists() for directory in directories))
+
+        unordered = list(s.solve_many(models[:2], max_workers=2))
+        self.assertEqual(sorted(run.name.split('-')[0] for soln, run in unordered), sorted(model.name for model in models[:2]))
+
+    def test_model_fingerprint(self):
+        # names and the order of addition don't matter, content does
+        model_1, model_2 = TestModels.ip_model_1(), TestModels.ip_model_1()
+        model_2.constraints = dict(reversed(list(model_2.constraints.items())))
+        self.assertEqual(flp.model_fingerprint(model_1), flp.model_fingerprint(model_2))
+
+        model_2 += flp.Constraint(model_2.variables['v2'], '<=', 5)
+        self.assertNotEqual(flp.model_fingerprint(model_1), flp.model_fingerprint(model_2))
+        model_1.variables['v2'].upper_bound = 5
+        self.assertNotEqual(flp.model_fingerprint(model_1), flp.model_fingerprint(TestModels.ip_model_1()))
+
+    def test_incremental_fingerprint(self):
+        model = TestModels.ip_model_1()
+        fingerprint = model.fingerprint()
+        self.assertEqual(fingerprint, flp.model_fingerprint(model))
+        self.assertEqual(model.fingerprint(), fingerprint)
+
+        # kept up to date as items are added, overwritten or changed
+        v3 = flp.variable.Continuous('v3', 0, 10)
+        model += v3
+        model += flp.Constraint(v3, '>=', model.variables['v1'] + 1, name='c3')
+        model.add_constraints(flp.Constraint(v3, '>=', 2, name='c3'), overwrite=True)
+        model.add_variables(flp.variable.Continuous('v3', 0, 20), overwrite=True)
+        model += flp.Objective('max', v3)
+        model.variables['v1'].continuous = True
+        self.assertEqual(model.fingerprint(), flp.model_fingerprint(model))
+        self.assertNotEqual(model.fingerprint(), fingerprint)
+
+        # the same content built in a different order
+        other = flp.Model()
+        other.add_variables(flp.variable.Continuous('v3', 0, 20), flp.variable.Continuous('v1', 0, 1), flp.variable.Integer('v2'))
+        other += flp.Objective('max', other.variables['v3'])
+        for con in reversed(list(model.constraints.values())):
+            other += flp.Constraint(con.lhs, con.mid, con.rhs)
+        self.assertEqual(other.fingerprint(), model.fingerprint())
+
+    @unittest.skipIf(np is None, 'requires numpy')
+    def test_incremental_fingerprint_arrays(self):
+        model = flp.Model()
+        model.fingerprint()
+        x = model.add_var_array(4, flp.variable.Binary, name='x')
+        model.add_constraints_from_matrix(np.eye(4), '<=', 1)
+        self.assertEqual(model.fingerprint(), flp.model_fingerprint(model))
+
+        x[:2].set_bounds(upper_bound=0)
+        self.assertEqual(model.fingerprint(), flp.model_fingerprint(model))
+
+    def test_solve_cache(self):
+        with tempfile.TemporaryDirectory() as directory:
+            s = Tests.universal_solver({'time_limit': 10})
+            s.cache = flp.SolveCache(directory)
+
+            soln_1, run_1 = s.solve(TestModels.lp_model_1())
+            soln_2, run_2 = s.solve(TestModels.lp_model_1())
+            self.assertFalse(run_1.cache_hit)
+            self.assertTrue(run_2.cache_hit)
+            self.assertEqual((run_2.name, run_2.term_status, run_2.log), (run_1.name, run_1.term_status, run_1.log))
+            self.assertEqual(soln_2.var_dict, soln_1.var_dict)
+            self.assertEqual((s.cache.hits, s.cache.misses), (1, 1))
+
+            # different parameters are a different entry
+            soln_3, run_3 = s.solve(TestModels.lp_model_1(), run_pyflip_params={'time_limit': 20})
+            self.assertFalse(run_3.cache_hit)
+            self.assertEqual(len(s.cache), 2)
+
+            # least recently used is evicted first
+            entries = s.cache.entries()
+            s.cache.evict(entries[-1][1])
+            self.assertEqual(len(s.cache), 1)
+            self.assertTrue(s.solve(TestModels.lp_model_1(), run_pyflip_params={'time_limit': 20})[1].cache_hit)
+            self.assertFalse(s.solve(TestModels.lp_model_1())[1].cache_hit)
+
+    def test_warm_start(self):
+        warm_start = flp.WarmStartManager()
+        s = Tests.universal_solver({'time_limit': 10})
+        model = TestModels.ip_model_1()
+        model.name = 'rolling'
+        self.assertIsNone(warm_start.mipstart(model))
+
+        soln, run = warm_start.solve(s, model)
+        self.assertEqual(model.objective.value(soln), -2.0)
+        self.assertFalse(warm_start.record(model, flp.Solution({'v1': 0, 'v2': 10}))) # worse than the stored solution
+
+        # the next model of the family has dropped v1 and added v3
+        model_2 = flp.Model('rolling')
+        v2, v3 = flp.variable.Integer('v2'), flp.variable.Binary('v3')
+        model_2 += v2, v3
+        model_2 += flp.Objective('min', v2)
+        model_2 += flp.Constraint(v2, '>=', -3 * v3 - 1)
+        self.assertEqual(warm_start.mipstart(model_2).var_dict, {'v2': -2.0})
+
+        soln_2, run_2 = warm_start.solve(s, model_2)
+        self.assertEqual(model_2.objective.value(soln_2), -4.0)
+        self.assertFalse(os.path.exists(run_2.params.value_by_pyflip_name('mipstart')))
+        self.assertEqual(warm_start.best['rolling'][1], -4.0)
+
+        with tempfile.TemporaryDirectory() as directory:
+            filename = s.write_mipstart_soln(run_2, flp.Solution({'v2': -4.0, 'v3': 1.0}), directory)
+            with open(filename) as fo:
+                self.assertEqual(fo.read(), '0 v2 -4.0\n1 v3 1.0\n')
+
+    @unittest.skipIf(sp is None, 'requires scipy')
+    def test_scipy_highs(self):
+        s = flp.solver.Highs({'time_limit': 10})
+
+        model = TestModels.lp_model_1()
+        soln, run = s.solve(model)
+        self.assertEqual(run.term_status, flp.RunStatus.OPTIMAL)
+        self.assertAlmostEqual(model.objective.value(soln), 35.0)
+        self.assertAlmostEqual(run.progress.primal, 35.0)
+        self.assertEqual(set(run.timings), {'compile', 'solve', 'read_solution'})
+
+        model = TestModels.ip_model_1()
+        soln, run = s.solve(model, run_solver_params={'mip_rel_gap': 0})
+        self.assertEqual(run.term_status, flp.RunStatus.OPTIMAL)
+        self.assertEqual((soln.get_val('v1'), soln.get_val('v2')), (1.0, -2.0))
+        self.assertTrue(model.is_feasible(soln))
+
+        model = TestModels.knapsack_model_1()
+        soln, run = s.solve(model)
+        cbc_soln, cbc_run = Tests.universal_solver({'time_limit': 10}).solve(model)
+        self.assertAlmostEqual(model.objective.value(soln), model.objective.value(cbc_soln))
+        self.assertAlmostEqual(run.progress.primal, model.objective.value(soln))
+
+        self.assertEqual(s.solve(TestModels.infeasible_ip_model_1())[1].term_status, flp.RunStatus.INFEASIBLE)
+        self.assertEqual(s.solve(TestModels.unbounded_lp_model_1())[1].term_status, flp.RunStatus.UNBOUNDED)
+
+        s.array_solutions = True
+        model = flp.Model()
+        x = model.add_var_array(3, flp.variable.Continuous, 0, 10, name='x')
+        model.add_constraints_from_matrix(np.ones((1, 3)), '<=', 12)
+        model += flp.Objective('max', x @ [1, 2, 3])
+        soln, run = s.solve(model)
+        self.assertIsInstance(soln, flp.ArraySolution)
+        np.testing.assert_allclose(soln.values, [0, 2, 10])
+
+    @unittest.skipIf(not hasattr(os, 'mkfifo'), 'requires named pipes')
+    def test_solve_fifo_1(self):
+        for model, obj_value in ((TestModels.lp_model_1(), 35.0), (TestModels.ip_model_1(), -2.0)):
+            s = Tests.universal_solver({'time_limit': 10}, io_mode='fifo')
+            soln, run = s.solve(model)
+
+            self.assertEqual(run.term_status, flp.RunStatus.OPTIMAL)
+            self.assertEqual(model.objective.value(soln), obj_value)
+            self.assertFalse(Path(run.params.value_by_pyflip_name('output_model_file')).exists())
+
+        # a solver which exits without opening either pipe must not hang the solve
+        if Path('/bin/true').exists():
+            s = Tests.universal_solver(io_mode='fifo', path_to_solver='/bin/true')
+            soln, run = s.solve(TestModels.ip_model_1())
+            self.assertFalse(Path(run.params.value_by_pyflip_name('output_soln_file')).exists())
+
+        with self.assertRaises(RuntimeError):
+            Tests.universal_solver(io_mode='fifo', model_format='mps')
+
+    def test_write_mps_file(self):
+        model = TestModels.ip_model_1()
+        fp = io.StringIO()
+        flp.write_mps_file(model, fp, free=False)
+        lines = fp.getvalue().splitlines()
+        self.assertEqual(lines[-1], 'ENDATA')
+        self.assertIn(' BV BND       v1', lines)
+        self.assertIn(' FR BND       v2', lines)
+        self.assertIn("    MARKER    'MARKER'  'INTORG'", lines)
+        self.assertEqual(lines.index("    MARKER    'MARKER'  'INTORG'"), lines.index('COLUMNS') + 1)
+
+        full_filename = flp.write_mps_file(model, 'test.mps.gz')
+        with gzip.open(full_filename, 'rt') as fo:
+            self.assertEqual(fo.read().splitlines()[0], f'NAME          {model.name}')
+        Path(full_filename).unlink()
+
+    @unittest.skipIf(np is None, 'requires numpy')
+    def test_read_mps_file(self):
+        for model in (TestModels.lp_model_1(), TestModels.ip_model_1()):
+            for free in (True, False):
+                fp = io.StringIO()
+                flp.write_mps_file(model, fp, free=free)
+                fp.seek(0)
+                read_model = flp.read_mps_file(fp, free=free)
+
+                self.assertEqual(read_model.objective.dir, model.objective.dir) # max objective is restored
+                self.assertEqual(read_model.objective.expr.var_dict, model.objective.expr.var_dict)
+                self.assertEqual(read_model.num_cons(), model.num_cons())
+                for name, variable in model.variables.items():
+                    read_variable = read_model.variables[name]
+                    self.assertIs(type(read_variable), type(variable))
+                    self.assertEqual((read_variable.lower_bound, read_variable.upper_bound), (variable.lower_bound, variable.upper_bound))
+
+                # rows are stored in a block, and their expressions built on request
+                for name, con in model.constraints.items():
+                    self.assertIsInstance(read_model.constraints[name], flp.BlockConstraint)
+                    self.assertEqual(read_model.constraints[name]._lhs.var_dict, con._lhs.var_dict)
+
+        mps_text = 'NAME test\nOBJSENSE\n    MAX\nROWS\n N obj\n L c1\n G c2\nCOLUMNS\n' \
+                   '    MARKER \'MARKER\' \'INTORG\'\n    x obj 1 c1 1\n    x c2 1\n' \
+                   '    MARKER \'MARKER\' \'INTEND\'\n    y obj 2 c1 1\n' \
+                   'RHS\n    c1 4 c2 1\n    obj -3\nBOUNDS\n UP BND x 3\n MI BND y\n UP BND y -1\nENDATA\n'
+        read_model = flp.read_mps_file(io.StringIO(mps_text))
+        self.assertEqual(read_model.name, 'test')
+        self.assertEqual(read_model.objective.dir, 'max')
+        self.assertEqual(read_model.objective.expr.constant, 3.0)
+        self.assertIsInstance(read_model.variables['x'], flp.variable.Integer)
+        self.assertEqual((read_model.variables['x'].lower_bound, read_model.variables['x'].upper_bound), (0, 3))
+        self.assertEqual((read_model.variables['y'].lower_bound, read_model.variables['y'].upper_bound), (-float('inf'), -1))
+        self.assertEqual(read_model.constraints['c1'].rhs.constant, 4.0)
+        self.assertEqual(read_model.constraints['c2'].mid, '>=')
+
+        # no RHS section, and a row without entries
+        mps_text = 'NAME\nROWS\n N obj\n L c1\n L c2\n E c3\nCOLUMNS\n    x obj 1 c1 1\n    x c3 1\nENDATA\n'
+        read_model = flp.read_mps_file(io.StringIO(mps_text))
+        self.assertEqual(read_model.num_cons(), 3)
+        self.assertEqual(read_model.constraints['c2'].lhs.var_dict, {})
+        self.assertEqual(read_model.constraints['c3'].rhs.constant, 0.0)
+
+    @unittest.skipIf(np is None, 'requires numpy')
+    def test_solve_read_mps_file(self):
+        for model, obj_value in ((TestModels.lp_model_1(), 35.0), (TestModels.ip_model_1(), -2.0)):
+            fp = io.StringIO()
+            flp.write_mps_file(model, fp)
+            fp.seek(0)
+            read_model = flp.read_mps_file(fp)
+
+            soln, run = Tests.universal_solver({'time_limit': 10}).solve(read_model)
+            self.assertEqual(run.term_status, flp.RunStatus.OPTIMAL)
+            self.assertEqual(read_model.objective.value(soln), obj_value)
+
     def test_solve_relaxed_ip_1(self):
         model = TestModels.ip_model_1()
 